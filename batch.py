@@ -0,0 +1,178 @@
+"""
+Headless batch runner: optimizes many portfolios from a job file across a
+process pool.
+
+Job file (JSON):
+
+    {
+      "defaults": {"data_file": "data/prices.csv", "optimizer": {"ngen": 50}},
+      "jobs": [
+        {"name": "tech", "tickers": ["AAPL", "MSFT", "GOOGL"], "forecast": "arima",
+         "normalize": false, "optimizer": {"pop_size": 100, "seed": 1}},
+        {"name": "banks", "tickers": ["JPM", "BAC", "C"]}
+      ]
+    }
+
+Job keys: name, data_file, tickers (omit for all), forecast ('default' for
+calculate_forecast, 'arima' for forecast_returns_arima), arima_method
+('statsmodels' or 'ols'), normalize, covariance ('sample', 'ledoit_wolf' or
+'factor') and optimizer (GeneticOptimizer keyword arguments; with
+max_holdings the job uses SparseGeneticOptimizer). Job values override the
+defaults; optimizer settings are merged.
+
+Each distinct price file is parsed once into the on-disk price cache before
+the jobs start, so workers only select their tickers' columns from it.
+
+Usage:
+
+    python batch.py jobs.json --output results/ --workers 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from ga.cov_ga import GeneticOptimizer
+from ga.sparse_ga import SparseGeneticOptimizer
+from ml.data_cache import default_cache_dir, is_cache_valid, build_cache
+from ml.data_preprocessing import load_data, compute_returns, normalize_returns
+from ml.forecasting import calculate_forecast, forecast_returns_arima, compute_covariance_matrix
+
+DEFAULT_JOB = {
+    "data_file": "data/prices.csv",
+    "tickers": None,
+    "forecast": "default",
+    "arima_method": "statsmodels",
+    "normalize": False,
+    "covariance": "sample",
+    "optimizer": {},
+}
+
+
+def load_jobs(path):
+    """Read a job file and return the jobs with defaults applied."""
+    with open(path) as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        spec = {"jobs": spec}
+
+    defaults = {**DEFAULT_JOB, **spec.get("defaults", {})}
+    jobs = []
+    for i, job in enumerate(spec["jobs"]):
+        merged = {**defaults, **job}
+        merged["optimizer"] = {**defaults.get("optimizer", {}), **job.get("optimizer", {})}
+        merged.setdefault("name", f"job{i + 1}")
+        if merged["forecast"] not in ("default", "arima"):
+            raise ValueError(f"Job {merged['name']}: unknown forecast '{merged['forecast']}'")
+        jobs.append(merged)
+
+    names = [job["name"] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Job names must be unique")
+    return jobs
+
+
+def prepare_sources(jobs):
+    """Parse every distinct price file once into its cache."""
+    for data_file in sorted({job["data_file"] for job in jobs}):
+        if not is_cache_valid(data_file, default_cache_dir(data_file)):
+            print(f"Building price cache for {data_file}")
+            build_cache(data_file)
+
+
+def run_job(job):
+    """Run one optimization job; errors are returned, not raised."""
+    start = time.perf_counter()
+    try:
+        data = load_data(job["data_file"], job["tickers"], use_cache=True)
+        returns = compute_returns(data)
+        if returns.empty:
+            raise ValueError("No overlapping price history for the selected tickers")
+        processed_returns = normalize_returns(returns) if job["normalize"] else returns
+
+        if job["forecast"] == "arima":
+            expected_returns = forecast_returns_arima(processed_returns, method=job["arima_method"])
+        else:
+            expected_returns, _ = calculate_forecast(processed_returns)
+            expected_returns = expected_returns.values
+
+        cov_matrix = compute_covariance_matrix(processed_returns, method=job["covariance"])
+        optimizer_class = SparseGeneticOptimizer if "max_holdings" in job["optimizer"] else GeneticOptimizer
+        optimizer = optimizer_class(**{"engine": "numpy", **job["optimizer"], "verbose": False})
+        tickers = list(processed_returns.columns)
+        best_portfolio, best_fitness, fitness_history = optimizer.run(expected_returns, cov_matrix, tickers)
+
+        return {
+            "name": job["name"],
+            "status": "ok",
+            "sharpe": float(best_fitness),
+            "weights": dict(zip(tickers, map(float, best_portfolio))),
+            "fitness_history": [float(f) for f in fitness_history],
+            "stop_reason": optimizer.stop_reason,
+            "seconds": time.perf_counter() - start,
+            "job": job,
+        }
+    except Exception as e:
+        return {
+            "name": job["name"],
+            "status": "error",
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": traceback.format_exc(),
+            "seconds": time.perf_counter() - start,
+            "job": job,
+        }
+
+
+def write_results(results, output_dir):
+    """One JSON file per job, plus summary.csv and weights.csv across all jobs."""
+    os.makedirs(output_dir, exist_ok=True)
+    for result in results:
+        with open(os.path.join(output_dir, f"{result['name']}.json"), "w") as f:
+            json.dump(result, f, indent=2)
+
+    summary = pd.DataFrame([{
+        "name": r["name"], "status": r["status"], "sharpe": r.get("sharpe"),
+        "n_tickers": len(r.get("weights", {})), "generations": len(r.get("fitness_history", [])),
+        "stop_reason": r.get("stop_reason"), "seconds": r["seconds"], "error": r.get("error"),
+    } for r in results])
+    summary.to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+
+    weights = pd.DataFrame([{"name": r["name"], "ticker": ticker, "weight": weight}
+                            for r in results for ticker, weight in r.get("weights", {}).items()],
+                           columns=["name", "ticker", "weight"])
+    weights.to_csv(os.path.join(output_dir, "weights.csv"), index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run portfolio optimization jobs headlessly.")
+    parser.add_argument("job_file", help="JSON job file")
+    parser.add_argument("--output", default="results", help="directory for the result files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.job_file)
+    prepare_sources(jobs)
+
+    start = time.perf_counter()
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(run_job, jobs))
+    else:
+        results = [run_job(job) for job in jobs]
+    write_results(results, args.output)
+
+    failed = [r for r in results if r["status"] != "ok"]
+    print(f"{len(results) - len(failed)}/{len(results)} jobs succeeded in "
+          f"{time.perf_counter() - start:.1f}s; results in {args.output}")
+    for r in failed:
+        print(f"  {r['name']}: {r['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
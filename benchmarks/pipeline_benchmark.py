@@ -0,0 +1,284 @@
+"""
+Benchmarks for the data -> forecast -> GA pipeline.
+
+Generates a synthetic long-format price CSV, times every pipeline stage on its
+own, sweeps the GA implementations over assets x pop_size x ngen, and records
+wall time and peak traced memory. Results are written as JSON and can be
+compared against a stored baseline run, flagging regressions past a threshold.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline_benchmark --output bench.json
+    python -m benchmarks.pipeline_benchmark --baseline bench.json --threshold 0.2
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import warnings
+import pandas as pd
+import numpy as np
+
+from ml.data_preprocessing import load_data, compute_returns, normalize_returns
+from ml.forecasting import calculate_forecast, forecast_returns_arima, compute_covariance_matrix
+from ga.cov_ga import GeneticOptimizer
+from ga import manual_ga
+
+
+def generate_price_csv(path, n_tickers=100, n_days=500, seed=0):
+    """
+    Write a synthetic price history in the long format of the NYSE dataset
+    (date, symbol, open, close, low, high, volume) and return its path.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2010-01-04", periods=n_days)
+    symbols = [f"T{i:05d}" for i in range(n_tickers)]
+
+    log_returns = rng.normal(0.0003, 0.015, size=(n_days, n_tickers))
+    close = 50.0 * np.exp(np.cumsum(log_returns, axis=0))
+    spread = np.abs(rng.normal(0, 0.005, size=close.shape)) * close
+
+    df = pd.DataFrame({
+        "date": np.repeat(dates.strftime("%Y-%m-%d"), n_tickers),
+        "symbol": np.tile(symbols, n_days),
+        "open": (close - spread / 2).ravel(),
+        "close": close.ravel(),
+        "low": (close - spread).ravel(),
+        "high": (close + spread).ravel(),
+        "volume": rng.integers(1_000, 1_000_000, size=close.size),
+    })
+    df.to_csv(path, index=False)
+    return path
+
+
+def _quiet_call(fn):
+    # The optimizers print their results; keep the benchmark output clean
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return fn()
+
+
+def measure(fn, repeat=1, trace_memory=True):
+    """
+    Call fn `repeat` times; return (the result of the first call, best wall
+    time in seconds, peak traced memory in MB).
+
+    Tracing memory slows pure-Python code several times over, so the timed
+    calls run untraced and the peak comes from one extra traced call (None
+    with trace_memory=False).
+    """
+    best = float("inf")
+    result = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        value = _quiet_call(fn)
+        best = min(best, time.perf_counter() - start)
+        if i == 0:
+            result = value
+
+    peak_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            _quiet_call(fn)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result, best, peak_mb
+
+
+def run_manual_ga(expected_returns, expected_vol, pop_size, ngen, seed):
+    # manual_ga reads its parameters from module constants
+    saved = manual_ga.POP_SIZE, manual_ga.NGEN
+    manual_ga.POP_SIZE, manual_ga.NGEN = pop_size, ngen
+    try:
+        return manual_ga.run_ga(list(expected_returns), list(expected_vol), seed=seed)
+    finally:
+        manual_ga.POP_SIZE, manual_ga.NGEN = saved
+
+
+def benchmark_pipeline(csv_path, n_select, arima_tickers, repeat, trace_memory=True):
+    """Time each pipeline stage separately."""
+    results = []
+
+    def record(stage, fn, **params):
+        value, seconds, peak_mb = measure(fn, repeat, trace_memory)
+        results.append({"stage": stage, "params": params, "seconds": seconds, "peak_mb": peak_mb})
+        return value
+
+    all_data = record("load_data", lambda: load_data(csv_path))
+    tickers = list(all_data.columns[:n_select])
+    record("load_data.filtered", lambda: load_data(csv_path, tickers), tickers=n_select)
+    record("load_data.chunked", lambda: load_data(csv_path, tickers, chunksize=100_000), tickers=n_select)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Every call builds into a fresh directory; reusing one would time cached loads
+        record("load_data.cache_build",
+               lambda: load_data(csv_path, use_cache=True, cache_dir=tempfile.mkdtemp(dir=cache_dir)))
+        load_data(csv_path, use_cache=True, cache_dir=cache_dir)
+        record("load_data.cached", lambda: load_data(csv_path, tickers, use_cache=True, cache_dir=cache_dir),
+               tickers=n_select)
+
+    returns = record("compute_returns", lambda: compute_returns(all_data))
+    record("normalize_returns", lambda: normalize_returns(returns))
+    record("calculate_forecast", lambda: calculate_forecast(returns))
+    record("forecast_returns_arima.ols", lambda: forecast_returns_arima(returns, method="ols"))
+    subset = returns.iloc[:, :arima_tickers]
+    record("forecast_returns_arima.statsmodels", lambda: forecast_returns_arima(subset),
+           tickers=arima_tickers)
+    record("compute_covariance_matrix", lambda: compute_covariance_matrix(returns))
+    return results
+
+
+def benchmark_ga(returns, assets, pop_sizes, ngens, repeat, seed=0, trace_memory=True):
+    """Sweep both GA implementations over assets x pop_size x ngen."""
+    results = []
+    for n_assets in assets:
+        sub = returns.iloc[:, :n_assets]
+        expected_returns = sub.mean().values
+        expected_vol = sub.std().values
+        cov_matrix = compute_covariance_matrix(sub)
+
+        for pop_size in pop_sizes:
+            for ngen in ngens:
+                params = {"assets": n_assets, "pop_size": pop_size, "ngen": ngen}
+                runs = {
+                    "cov_ga.python": lambda: GeneticOptimizer(pop_size=pop_size, ngen=ngen, seed=seed)
+                        .run(expected_returns, cov_matrix),
+                    "cov_ga.numpy": lambda: GeneticOptimizer(pop_size=pop_size, ngen=ngen, seed=seed,
+                                                             engine="numpy").run(expected_returns, cov_matrix),
+                    "manual_ga": lambda: run_manual_ga(expected_returns, expected_vol, pop_size, ngen, seed),
+                }
+                for stage, fn in runs.items():
+                    (_, fitness, _), seconds, peak_mb = measure(fn, repeat, trace_memory)
+                    results.append({"stage": stage, "params": params, "seconds": seconds,
+                                    "peak_mb": peak_mb, "fitness": float(fitness)})
+    return results
+
+
+def evaluations_to_reach(best_fits, evaluations, target):
+    """Fitness evaluations spent when best_fits first reached target, or None."""
+    for fitness, count in zip(best_fits, evaluations):
+        if fitness >= target:
+            return count
+    return None
+
+
+def benchmark_convergence(returns, n_assets, pop_size, ngen, target_fraction=0.95, seed=0, trace_memory=True):
+    """
+    Run the NumPy engine with and without hybrid mode and count the fitness
+    evaluations each needs to reach target_fraction of the best Sharpe found.
+    """
+    sub = returns.iloc[:, :n_assets]
+    expected_returns = sub.mean().values
+    cov_matrix = compute_covariance_matrix(sub)
+    params = {"assets": n_assets, "pop_size": pop_size, "ngen": ngen}
+
+    runs = {}
+    for stage, hybrid in (("convergence.numpy", False), ("convergence.hybrid", True)):
+        def optimize():
+            optimizer = GeneticOptimizer(pop_size=pop_size, ngen=ngen, seed=seed, engine="numpy", hybrid=hybrid)
+            return optimizer, optimizer.run(expected_returns, cov_matrix)
+
+        (optimizer, (_, fitness, history)), seconds, peak_mb = measure(optimize, trace_memory=trace_memory)
+        runs[stage] = (optimizer, fitness, history, seconds, peak_mb)
+
+    target = target_fraction * max(fitness for _, fitness, _, _, _ in runs.values())
+    return [{"stage": stage, "params": params, "seconds": seconds, "peak_mb": peak_mb, "fitness": float(fitness),
+             "evaluations": optimizer.evaluations_over_time[-1],
+             "evaluations_to_target": evaluations_to_reach(history, optimizer.evaluations_over_time, target)}
+            for stage, (optimizer, fitness, history, seconds, peak_mb) in runs.items()]
+
+
+def _result_key(result):
+    return result["stage"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline, threshold):
+    """
+    Return the results whose time grew by more than `threshold` (a fraction)
+    relative to the matching stage and parameters of the baseline run.
+    """
+    previous = {_result_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(_result_key(result))
+        if old is None or old["seconds"] <= 0:
+            continue
+        change = result["seconds"] / old["seconds"] - 1
+        if change > threshold:
+            regressions.append({**result, "baseline_seconds": old["seconds"], "change": change})
+    return regressions
+
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=200, help="tickers in the synthetic CSV")
+    parser.add_argument("--days", type=int, default=750, help="trading days in the synthetic CSV")
+    parser.add_argument("--select", type=int, default=20, help="tickers used for filtered loads")
+    parser.add_argument("--arima-tickers", type=int, default=10, help="tickers fitted with statsmodels")
+    parser.add_argument("--assets", type=_int_list, default=[10, 50], help="comma-separated GA asset counts")
+    parser.add_argument("--pop-sizes", type=_int_list, default=[50, 200], help="comma-separated population sizes")
+    parser.add_argument("--ngens", type=_int_list, default=[20], help="comma-separated generation counts")
+    parser.add_argument("--convergence-ngen", type=int, default=100,
+                        help="generations for the hybrid vs. plain convergence comparison")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best time is kept")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the extra traced run that measures peak memory")
+    parser.add_argument("--csv", help="existing long-format CSV to use instead of a synthetic one")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv or generate_price_csv(os.path.join(tmp, "prices.csv"), args.tickers, args.days)
+        trace_memory = not args.no_memory
+        results = benchmark_pipeline(csv_path, args.select, args.arima_tickers, args.repeat, trace_memory)
+        returns, _, _ = measure(lambda: compute_returns(load_data(csv_path)), trace_memory=False)
+    results += benchmark_ga(returns, args.assets, args.pop_sizes, args.ngens, args.repeat,
+                            trace_memory=trace_memory)
+    results += benchmark_convergence(returns, max(args.assets), args.pop_sizes[0], args.convergence_ngen,
+                                     trace_memory=trace_memory)
+
+    report = {
+        "meta": {"tickers": args.tickers, "days": args.days, "csv": args.csv,
+                 "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                 "machine": platform.machine(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+
+    for r in results:
+        params = " ".join(f"{k}={v}" for k, v in r["params"].items())
+        memory = "" if r["peak_mb"] is None else f"{r['peak_mb']:>10.1f} MB"
+        print(f"{r['stage']:<36} {params:<36} {r['seconds']:>10.4f}s {memory}")
+        if "evaluations_to_target" in r:
+            print(f"{'':<36} {'':<36} {r['evaluations_to_target']} of {r['evaluations']} evaluations to target")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} {r['params']}: {r['baseline_seconds']:.4f}s -> "
+                  f"{r['seconds']:.4f}s (+{r['change']:.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
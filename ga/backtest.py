@@ -0,0 +1,131 @@
+import pandas as pd
+import numpy as np
+
+from ga.cov_ga import GeneticOptimizer
+from ml.data_preprocessing import compute_returns
+from ml.forecasting import calculate_forecast, forecast_returns_arima
+from ml.incremental import IncrementalStats
+
+TRADING_DAYS = 252
+
+
+def _forecast(train_returns, method, window_size, cache):
+    """
+    Expected returns for one training window, memoized in `cache` by method and
+    window so repeated backtests over the same dates don't refit.
+    """
+    key = (method, window_size, train_returns.index[0], train_returns.index[-1], tuple(train_returns.columns))
+    if key not in cache:
+        if method == "mean":
+            forecast, _ = calculate_forecast(train_returns, window_size)
+            cache[key] = forecast.to_numpy()
+        elif method in ("ols", "statsmodels"):
+            cache[key] = forecast_returns_arima(train_returns, method=method)
+        else:
+            raise ValueError(f"Unknown forecast '{method}', expected 'mean', 'ols' or 'statsmodels'")
+    return cache[key]
+
+
+def walk_forward_backtest(prices, lookback=252, rebalance_every=21, expanding=False, forecast="mean",
+                          window_size=20, optimizer_params=None, warm_start_fraction=0.5,
+                          forecast_cache=None, seed=None):
+    """
+    Walk-forward backtest of the GA portfolio.
+
+    At every rebalance date the GA is re-optimized on the trailing `lookback`
+    returns (or all returns so far when expanding=True), and the weights are held
+    over the next `rebalance_every` out-of-sample days.
+
+    Work is shared between rebalances:
+    - the covariance is updated incrementally with IncrementalStats, adding (and
+      for a rolling window dropping) only the days since the last rebalance;
+    - each GA run is warm-started with the best `warm_start_fraction` of the
+      previous date's final population;
+    - forecasts are memoized per window in `forecast_cache` (a dict, which can be
+      passed again to reuse them across backtests).
+
+    Parameters:
+    prices (pd.DataFrame): Pivoted prices as returned by load_data.
+    forecast (str): 'mean' (calculate_forecast), 'ols' or 'statsmodels' (ARIMA backends).
+    optimizer_params (dict): Keyword arguments for GeneticOptimizer.
+
+    Returns:
+    dict: 'returns' (daily out-of-sample portfolio returns), 'weights' (one row per
+          rebalance date), 'turnover' (per rebalance date) and 'metrics'.
+    """
+    returns = compute_returns(prices)
+    if len(returns) <= lookback:
+        raise ValueError("Not enough history for a single rebalance")
+
+    params = {"engine": "numpy", **(optimizer_params or {})}
+    params["verbose"] = False
+    optimizer = GeneticOptimizer(seed=seed, **params)
+    forecast_cache = {} if forecast_cache is None else forecast_cache
+    n_warm = int(round(warm_start_fraction * optimizer.pop_size))
+
+    # Statistics over returns[:lookback]; prices has one more row than returns
+    stats = IncrementalStats.from_prices(prices.iloc[:lookback + 1], window_size=lookback)
+    stats_end = lookback
+
+    daily_returns = []
+    weights = {}
+    turnover = {}
+    previous_population = None
+    drifted = None
+
+    for start in range(lookback, len(returns), rebalance_every):
+        # Bring the running statistics up to the rebalance date
+        if start > stats_end:
+            stats.update(prices.iloc[stats_end + 1:start + 1])
+            stats_end = start
+        cov_matrix = stats.covariance() if expanding else stats.window_covariance()
+
+        train = returns.iloc[:start] if expanding else returns.iloc[start - lookback:start]
+        expected_returns = _forecast(train, forecast, window_size, forecast_cache)
+
+        initial = None
+        if previous_population is not None and n_warm > 0:
+            initial = previous_population[np.argsort(optimizer.fitnesses)[::-1][:n_warm]]
+        best, _, _ = optimizer.run(expected_returns, cov_matrix.to_numpy(), list(returns.columns),
+                                   initial_population=initial)
+        previous_population = optimizer.population
+        w = np.asarray(best)
+
+        date = returns.index[start]
+        weights[date] = w
+        turnover[date] = np.abs(w - drifted).sum() if drifted is not None else np.abs(w).sum()
+
+        # Hold the weights over the out-of-sample period, letting them drift
+        oos = returns.iloc[start:start + rebalance_every].to_numpy()
+        growth = np.cumprod(1 + oos, axis=0) @ w
+        values = np.concatenate([[1.0], growth])
+        daily_returns.append(pd.Series(values[1:] / values[:-1] - 1, index=returns.index[start:start + len(oos)]))
+        drifted = w * np.prod(1 + oos, axis=0)
+        drifted = drifted / drifted.sum()
+
+    portfolio_returns = pd.concat(daily_returns)
+    turnover = pd.Series(turnover, name="turnover")
+    return {
+        "returns": portfolio_returns,
+        "weights": pd.DataFrame.from_dict(weights, orient="index", columns=returns.columns),
+        "turnover": turnover,
+        "metrics": performance_metrics(portfolio_returns, turnover),
+    }
+
+
+def performance_metrics(portfolio_returns, turnover=None):
+    """Realized performance of a daily return series (annualized with 252 days)."""
+    wealth = (1 + portfolio_returns).cumprod()
+    ann_return = wealth.iloc[-1] ** (TRADING_DAYS / len(portfolio_returns)) - 1
+    ann_vol = portfolio_returns.std() * np.sqrt(TRADING_DAYS)
+    metrics = {
+        "total_return": wealth.iloc[-1] - 1,
+        "annualized_return": ann_return,
+        "annualized_volatility": ann_vol,
+        "sharpe": portfolio_returns.mean() / portfolio_returns.std() * np.sqrt(TRADING_DAYS)
+                  if portfolio_returns.std() > 0 else np.nan,
+        "max_drawdown": (wealth / wealth.cummax() - 1).min(),
+    }
+    if turnover is not None:
+        metrics["average_turnover"] = turnover.mean()
+    return metrics
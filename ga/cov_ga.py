@@ -1,10 +1,76 @@
+import os
+import json
+import time
 import pandas as pd
 import numpy as np
 import random
-import matplotlib.pyplot as plt
+from ml import instrumentation
+
+def portfolio_variance(w, cov_matrix):
+    # w^T * Cov * w for one portfolio, or row-wise for a (pop_size, n_assets) array.
+    # Structured covariance models (e.g. ml.covariance.LowRankCovariance) provide
+    # their own quad_form, so the dense matrix is never built.
+    if hasattr(cov_matrix, "quad_form"):
+        return cov_matrix.quad_form(w)
+    if np.ndim(w) == 1:
+        return w.dot(cov_matrix).dot(w)
+    return np.einsum('ij,ij->i', w @ np.asarray(cov_matrix, dtype=float), w)
+
+def covariance_dot(w, cov_matrix):
+    # Cov @ w, using the structured model's own product when there is one
+    if hasattr(cov_matrix, "dot"):
+        return np.asarray(cov_matrix.dot(w), dtype=float)
+    return np.asarray(cov_matrix, dtype=float) @ w
+
+def covariance_columns_dot(idx, delta, cov_matrix):
+    # Cov[:, idx] @ delta: the change in Cov @ w when only w[idx] moves, in O(kN)
+    if hasattr(cov_matrix, "columns_dot"):
+        return cov_matrix.columns_dot(idx, delta)
+    return np.asarray(cov_matrix, dtype=float)[:, idx] @ delta
+
+def covariance_solve(b, cov_matrix):
+    # Cov^-1 @ b; structured models solve without the dense matrix (Woodbury)
+    if hasattr(cov_matrix, "solve"):
+        return np.asarray(cov_matrix.solve(b), dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+    try:
+        return np.linalg.solve(cov, b)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(cov, b, rcond=None)[0]
+
+def project_to_simplex(v):
+    # Euclidean projection of a vector, or of every row of an array, onto
+    # {w : w >= 0, sum(w) = 1}
+    v = np.asarray(v, dtype=float)
+    rows = np.atleast_2d(v)
+    u = -np.sort(-rows, axis=1)
+    cumulative = np.cumsum(u, axis=1) - 1
+    k = np.arange(1, rows.shape[1] + 1)
+    rho = (u - cumulative / k > 0).sum(axis=1)
+    theta = cumulative[np.arange(len(rows)), rho - 1] / rho
+    w = np.maximum(rows - theta[:, None], 0)
+    return w[0] if v.ndim == 1 else w
+
+def make_rngs(seed=None):
+    # Returns the (random.Random, np.random.Generator) pair used by the python
+    # and NumPy engines. seed may be None, an int or SeedSequence, or an existing
+    # random.Random / np.random.Generator, whose stream is then used directly.
+    if isinstance(seed, random.Random):
+        return seed, np.random.default_rng(seed.getrandbits(64))
+    if isinstance(seed, np.random.Generator):
+        return random.Random(int(seed.integers(2**63))), seed
+    np_rng = np.random.default_rng(seed)
+    return random.Random(int(np_rng.integers(2**63))), np_rng
 
 class GeneticOptimizer:
-    def __init__(self, pop_size=50, ngen=20, tourn_size=3, cxpb=0.7, mutpb=0.2, mut_step=0.05, risk_free_rate=0.0):
+    def __init__(self, pop_size=50, ngen=20, tourn_size=3, cxpb=0.7, mutpb=0.2, mut_step=0.05, risk_free_rate=0.0,
+                 engine="python", delta_eval=False, seed=None, verbose=True, hybrid=False, seed_fraction=0.1,
+                 refine_every=5, refine_elites=2, refine_steps=5, stall_generations=None, stall_tolerance=1e-6,
+                 min_diversity=None, adaptive=False):
+        if engine not in ("python", "numpy"):
+            raise ValueError(f"Unknown engine '{engine}', expected 'python' or 'numpy'")
+        if delta_eval and engine != "python":
+            raise ValueError("delta_eval is only supported by the python engine")
         self.pop_size = pop_size
         self.ngen = ngen
         self.tourn_size = tourn_size
@@ -12,9 +78,33 @@ class GeneticOptimizer:
         self.mutpb = mutpb
         self.mut_step = mut_step
         self.risk_free_rate = risk_free_rate
+        self.engine = engine
+        self.delta_eval = delta_eval
+        self.verbose = verbose
+        # Hybrid mode: seed_fraction of the first population comes from the
+        # analytic max-Sharpe / min-variance portfolios, and every refine_every
+        # generations the refine_elites best individuals get refine_steps
+        # projected-gradient steps on their Sharpe ratio
+        self.hybrid = hybrid
+        self.seed_fraction = seed_fraction
+        self.refine_every = refine_every
+        self.refine_elites = refine_elites
+        self.refine_steps = refine_steps
+        # Early stopping: end the run once the best fitness has improved by no
+        # more than stall_tolerance over stall_generations generations, or once
+        # population diversity drops below min_diversity times its starting value
+        self.stall_generations = stall_generations
+        self.stall_tolerance = stall_tolerance
+        self.min_diversity = min_diversity
+        # Adapt mutpb and mut_step each generation from improvement and diversity
+        self.adaptive = adaptive
+        # All randomness comes from these generators, never the global random module
+        self.rng, self.np_rng = make_rngs(seed)
+        # Fitness evaluations of the last run, split into full and delta (fast path) ones
+        self.eval_counts = {"full": 0, "delta": 0}
     
     def random_portfolio(self, num_stocks):
-        w = [random.random() for _ in range(num_stocks)]
+        w = [self.rng.random() for _ in range(num_stocks)]
         total = sum(w)
         return [x/total for x in w]
     
@@ -34,24 +124,27 @@ class GeneticOptimizer:
         port_return = w.dot(expected_returns)
         
         # Portfolio variance and std dev using covariance matrix: w^T * Cov * w
-        port_variance = w.dot(cov_matrix).dot(w)
+        port_variance = portfolio_variance(w, cov_matrix)
         port_vol = np.sqrt(port_variance) if port_variance > 0 else 0.000001
 
         sharpe = (port_return - self.risk_free_rate) / port_vol
         return sharpe
     
     def tournament_selection(self, pop, fits, tourn_size):
-        chosen = random.sample(range(len(pop)), tourn_size)
+        return pop[self.tournament_index(pop, fits, tourn_size)][:]
+
+    def tournament_index(self, pop, fits, tourn_size):
+        chosen = self.rng.sample(range(len(pop)), tourn_size)
         best = chosen[0]
         for c in chosen[1:]:
             if fits[c] > fits[best]:
                 best = c
-        return pop[best][:]
+        return best
     
     def crossover(self, ind1, ind2):
         size = len(ind1)
         for i in range(size):
-            alpha = random.random()
+            alpha = self.rng.random()
             w1, w2 = ind1[i], ind2[i]
             new_w1 = alpha * w1 + (1 - alpha) * w2
             new_w2 = alpha * w2 + (1 - alpha) * w1
@@ -60,64 +153,660 @@ class GeneticOptimizer:
         self.normalize(ind2)
     
     def mutate(self, ind):
+        self.perturb(ind)
+        self.normalize(ind)
+
+    def perturb(self, ind):
+        # Mutation without the final normalize; returns (index, old weight) of
+        # every gene that was changed
+        touched = []
         for i in range(len(ind)):
-            if random.random() < self.mutpb:
-                ind[i] += random.uniform(-self.mut_step, self.mut_step)
-        # Remove negatives and normalize
+            if self.rng.random() < self.mutpb:
+                touched.append((i, ind[i]))
+                ind[i] += self.rng.uniform(-self.mut_step, self.mut_step)
+        # Remove negatives
         ind[:] = [max(0, w) for w in ind]
+        return touched
+
+    ##########################
+    # Delta fitness evaluation
+    ##########################
+    # Each individual carries (Cov @ w, w . expected_returns) so that a mutation
+    # touching k genes is rescored in O(kN) instead of the O(N^2) quadratic form.
+
+    def evaluate_with_state(self, individual, expected_returns, cov_matrix):
+        w = np.array(individual)
+        cov_w = covariance_dot(w, cov_matrix)
+        port_return = w.dot(expected_returns)
+        self.eval_counts["full"] += 1
+        return self._sharpe(port_return, w.dot(cov_w)), (cov_w, port_return)
+
+    def mutate_with_state(self, ind, state, expected_returns, cov_matrix):
+        # Mutates ind in place and returns its new (fitness, state)
+        touched = self.perturb(ind)
+        total = sum(ind)
+        if total <= 0:
+            self.normalize(ind)
+            return self.evaluate_with_state(ind, expected_returns, cov_matrix)
+
+        cov_w, port_return = state
+        if touched:
+            idx = np.array([i for i, _ in touched])
+            delta = np.array([ind[i] - old for i, old in touched])
+            cov_w = cov_w + covariance_columns_dot(idx, delta, cov_matrix)
+            port_return = port_return + np.asarray(expected_returns)[idx].dot(delta)
+
+        # Renormalizing divides w by its sum, and so both cached quantities
         self.normalize(ind)
+        cov_w = cov_w / total
+        port_return = port_return / total
+        self.eval_counts["delta"] += 1
+        return self._sharpe(port_return, np.dot(ind, cov_w)), (cov_w, port_return)
+
+    def _sharpe(self, port_return, port_variance):
+        port_vol = np.sqrt(port_variance) if port_variance > 0 else 0.000001
+        return (port_return - self.risk_free_rate) / port_vol
+
+    ##########################
+    # NumPy population engine
+    ##########################
+    # The whole population is one (pop_size, n_assets) array and every
+    # operator below works on all individuals at once.
+
+    def random_population(self, num_stocks, size=None):
+        size = self.pop_size if size is None else size
+        pop = self.np_rng.random((size, num_stocks))
+        return pop / pop.sum(axis=1, keepdims=True)
+
+    def normalize_population(self, pop):
+        sums = pop.sum(axis=1, keepdims=True)
+        np.divide(pop, sums, out=pop, where=sums > 0)
+        # Rows that summed to zero are evenly distributed, as in normalize()
+        pop[sums[:, 0] <= 0] = 1.0 / pop.shape[1]
+        return pop
+
+    def evaluate_population(self, pop, expected_returns, cov_matrix):
+        pop = np.asarray(pop, dtype=float)
+        port_returns = pop @ np.asarray(expected_returns, dtype=float)
+
+        # Batched quadratic form: row-wise w^T * Cov * w for the whole population
+        port_variances = portfolio_variance(pop, cov_matrix)
+        port_vols = np.sqrt(np.where(port_variances > 0, port_variances, 0.000001 ** 2))
+
+        return (port_returns - self.risk_free_rate) / port_vols
+
+    def tournament_contestants(self, pop_size, shape):
+        # (*shape, tourn_size) indices into a population of pop_size; like
+        # random.sample in tournament_selection, each tournament has no
+        # repeated contestants
+        if self.tourn_size > pop_size:
+            raise ValueError("Tournament size cannot exceed the population size")
+        if self.tourn_size * self.tourn_size > pop_size:
+            # Repeats would be likely and redrawing could take forever; draw
+            # without replacement from a random key per individual instead
+            keys = self.np_rng.random((*shape, pop_size))
+            return np.argpartition(keys, self.tourn_size - 1, axis=-1)[..., :self.tourn_size]
+        contestants = self.np_rng.integers(0, pop_size, size=(*shape, self.tourn_size))
+        # Redraw tournaments that picked the same individual twice; with
+        # tourn_size^2 <= pop_size most draws have no repeats
+        if self.tourn_size > 1:
+            while True:
+                ordered = np.sort(contestants, axis=-1)
+                dup = (ordered[..., 1:] == ordered[..., :-1]).any(axis=-1)
+                if not dup.any():
+                    break
+                contestants[dup] = self.np_rng.integers(0, pop_size, size=(dup.sum(), self.tourn_size))
+        return contestants
+
+    def tournament_selection_population(self, fits, n):
+        # Returns the indices of n tournament winners
+        contestants = self.tournament_contestants(len(fits), (n,))
+        winners = np.argmax(np.asarray(fits)[contestants], axis=1)
+        return contestants[np.arange(n), winners]
+
+    def crossover_population(self, parents1, parents2):
+        mate = self.np_rng.random(len(parents1)) < self.cxpb
+        alpha = self.np_rng.random(parents1.shape)
+        children1 = np.where(mate[:, None], alpha * parents1 + (1 - alpha) * parents2, parents1)
+        children2 = np.where(mate[:, None], alpha * parents2 + (1 - alpha) * parents1, parents2)
+        return self.normalize_population(children1), self.normalize_population(children2)
+
+    def mutate_population(self, pop):
+        mask = self.np_rng.random(pop.shape) < self.mutpb
+        steps = self.np_rng.uniform(-self.mut_step, self.mut_step, pop.shape)
+        pop += np.where(mask, steps, 0.0)
+        # Remove negatives and normalize
+        np.clip(pop, 0, None, out=pop)
+        return self.normalize_population(pop)
+
+    ##############
+    # Hybrid mode
+    ##############
+
+    def analytic_population(self, expected_returns, cov_matrix):
+        # seed_fraction * pop_size portfolios spread between the long-only
+        # projections of the min-variance and max-Sharpe solutions
+        expected_returns = np.asarray(expected_returns, dtype=float)
+        num_stocks = len(expected_returns)
+        n_seeds = min(self.pop_size, max(2, int(round(self.seed_fraction * self.pop_size))))
+
+        anchors = []
+        for direction in (np.ones(num_stocks), expected_returns - self.risk_free_rate):
+            w = covariance_solve(direction, cov_matrix)
+            # Scale to a fully invested portfolio before projecting when possible
+            anchors.append(project_to_simplex(w / w.sum() if w.sum() > 0 else w))
+        min_variance, max_sharpe = anchors
+
+        alphas = np.linspace(0, 1, n_seeds)[:, None]
+        return (1 - alphas) * min_variance + alphas * max_sharpe
+
+    def sharpe_gradient_step(self, w, fitness, expected_returns, cov_matrix, step):
+        # One projected-gradient ascent step on the Sharpe ratio with a halving
+        # line search; returns (w, fitness, step), unchanged if nothing improved
+        cov_w = covariance_dot(w, cov_matrix)
+        port_vol = np.sqrt(max(w.dot(cov_w), 0.000001 ** 2))
+        port_return = w.dot(expected_returns)
+        grad = expected_returns / port_vol - (port_return - self.risk_free_rate) * cov_w / port_vol ** 3
+        scale = np.abs(grad).max()
+        if scale == 0:
+            return w, fitness, step
+        grad = grad / scale
+
+        while step > 1e-6:
+            candidate = project_to_simplex(w + step * grad)
+            self.eval_counts["full"] += 1
+            candidate_fitness = self.evaluate(candidate, expected_returns, cov_matrix)
+            if candidate_fitness > fitness:
+                return candidate, candidate_fitness, step * 2
+            step /= 2
+        return w, fitness, step
+
+    def _refine_elites(self, population, fitnesses, expected_returns, cov_matrix):
+        # Local search on the best individuals, written back in place
+        expected_returns = np.asarray(expected_returns, dtype=float)
+        for idx in np.argsort(np.asarray(fitnesses))[::-1][:self.refine_elites]:
+            w, fitness = np.asarray(population[idx], dtype=float), fitnesses[idx]
+            step = self.mut_step
+            for _ in range(self.refine_steps):
+                w, fitness, step = self.sharpe_gradient_step(w, fitness, expected_returns, cov_matrix, step)
+            if fitness <= fitnesses[idx]:
+                continue
+            if self.engine == "numpy":
+                population[idx] = w
+            else:
+                population[idx] = w.tolist()
+            fitnesses[idx] = fitness
+            if self.delta_eval:
+                self._states[idx] = (covariance_dot(w, cov_matrix), w.dot(expected_returns))
+
+    ###################################
+    # Early stopping and adaptive rates
+    ###################################
+
+    def population_diversity(self, population):
+        # Mean standard deviation of each asset's weight across the population
+        return float(np.asarray(population, dtype=float).std(axis=0).mean())
+
+    def _check_stop(self, best_fits_over_time, diversity_ratio):
+        # Reason to stop after this generation, or None
+        k = self.stall_generations
+        if k and len(best_fits_over_time) > k:
+            if best_fits_over_time[-1] - best_fits_over_time[-1 - k] <= self.stall_tolerance:
+                return "stall"
+        if self.min_diversity is not None and diversity_ratio < self.min_diversity:
+            return "diversity"
+        return None
+
+    def _adapt_operators(self, improved, diversity_ratio, base_mutpb, base_mut_step):
+        # Take smaller steps while the best keeps improving and larger ones
+        # when it stalls; raise the mutation rate as diversity collapses
+        if improved:
+            self.mut_step = max(self.mut_step * 0.85, base_mut_step / 10)
+        else:
+            self.mut_step = min(self.mut_step * 1.2, base_mut_step * 5)
+        if diversity_ratio < 0.5:
+            self.mutpb = min(self.mutpb * 1.2, 1.0)
+        else:
+            self.mutpb = base_mutpb + 0.5 * (self.mutpb - base_mutpb)
+
+    ###############
+    # Run the GA
+    ###############
+
+    def _init_population(self, num_stocks, initial_population=None):
+        # Start from the given individuals (e.g. a previous run's survivors),
+        # topped up with random portfolios to pop_size
+        if initial_population is None or len(initial_population) == 0:
+            seeded = np.empty((0, num_stocks))
+        else:
+            seeded = np.clip(np.asarray(initial_population, dtype=float)[:self.pop_size], 0, None)
+            if seeded.shape[1] != num_stocks:
+                raise ValueError("Initial population does not match the number of assets")
+            seeded = self.normalize_population(seeded)
+        n_random = self.pop_size - len(seeded)
+
+        if self.engine == "numpy":
+            return np.vstack([seeded, self.random_population(num_stocks, n_random)])
+        return seeded.tolist() + [self.random_portfolio(num_stocks) for _ in range(n_random)]
+
+    def _evaluate_all(self, population, expected_returns, cov_matrix):
+        if self.engine == "numpy":
+            self.eval_counts["full"] += len(population)
+            return self.evaluate_population(population, expected_returns, cov_matrix)
+        if self.delta_eval:
+            scored = [self.evaluate_with_state(ind, expected_returns, cov_matrix) for ind in population]
+            self._states = [state for _, state in scored]
+            return [fit for fit, _ in scored]
+        self.eval_counts["full"] += len(population)
+        return [self.evaluate(ind, expected_returns, cov_matrix) for ind in population]
+
+    def _next_generation(self, population, fitnesses, expected_returns, cov_matrix):
+        # Returns the next population and its fitnesses, or None when they
+        # still have to be evaluated
+        if self.delta_eval:
+            return self._breed_delta(population, fitnesses, expected_returns, cov_matrix)
+        return self._breed(population, fitnesses), None
+
+    def _breed(self, population, fitnesses):
+        # Time spent in selection is kept in self._select_seconds when
+        # instrumentation is enabled
+        timing = instrumentation.enabled()
+        self._select_seconds = 0.0
+
+        if self.engine == "numpy":
+            n_pairs = self.pop_size // 2
+            start = time.perf_counter() if timing else 0.0
+            parents = population[self.tournament_selection_population(fitnesses, 2 * n_pairs)]
+            if timing:
+                self._select_seconds = time.perf_counter() - start
+            children1, children2 = self.crossover_population(parents[:n_pairs], parents[n_pairs:])
+            new_population = np.empty_like(parents)
+            new_population[0::2] = self.mutate_population(children1)
+            new_population[1::2] = self.mutate_population(children2)
+            return new_population
+
+        new_population = []
+        for _ in range(self.pop_size // 2):
+            start = time.perf_counter() if timing else 0.0
+            parent1 = self.tournament_selection(population, fitnesses, self.tourn_size)
+            parent2 = self.tournament_selection(population, fitnesses, self.tourn_size)
+            if timing:
+                self._select_seconds += time.perf_counter() - start
+            
+            if self.rng.random() < self.cxpb:
+                self.crossover(parent1, parent2)
+            
+            self.mutate(parent1)
+            self.mutate(parent2)
+            
+            new_population.append(parent1)
+            new_population.append(parent2)
+        return new_population
+
+    def _breed_delta(self, population, fitnesses, expected_returns, cov_matrix):
+        timing = instrumentation.enabled()
+        self._select_seconds = 0.0
+        new_population, new_fitnesses, new_states = [], [], []
+        for _ in range(self.pop_size // 2):
+            start = time.perf_counter() if timing else 0.0
+            idx1 = self.tournament_index(population, fitnesses, self.tourn_size)
+            idx2 = self.tournament_index(population, fitnesses, self.tourn_size)
+            if timing:
+                self._select_seconds += time.perf_counter() - start
+            parent1, parent2 = population[idx1][:], population[idx2][:]
+            states = (self._states[idx1], self._states[idx2])
+
+            if self.rng.random() < self.cxpb:
+                # Crossover changes every gene, so children are scored in full
+                self.crossover(parent1, parent2)
+                for child in (parent1, parent2):
+                    self.mutate(child)
+                    fit, state = self.evaluate_with_state(child, expected_returns, cov_matrix)
+                    new_fitnesses.append(fit)
+                    new_states.append(state)
+            else:
+                for child, state in zip((parent1, parent2), states):
+                    fit, state = self.mutate_with_state(child, state, expected_returns, cov_matrix)
+                    new_fitnesses.append(fit)
+                    new_states.append(state)
+
+            new_population.append(parent1)
+            new_population.append(parent2)
+
+        self._states = new_states
+        return new_population, new_fitnesses
+
+    ################
+    # Checkpoints
+    ################
+
+    def save_checkpoint(self, path, generation, population, fitnesses, best_individual, best_fitness,
+                        best_fits_over_time, initial_diversity=None):
+        # Compressed .npz holding the state at the start of `generation`:
+        # population (and its fitnesses when known), best-so-far, history,
+        # both RNG states and the adaptive operator state. Written to a temporary file first so a crash never
+        # leaves a truncated checkpoint behind.
+        version, internal, gauss_next = self.rng.getstate()
+        meta = {"generation": generation, "engine": self.engine,
+                "best_fitness": None if best_individual is None else float(best_fitness),
+                "py_rng": [version, gauss_next], "np_rng": self.np_rng.bit_generator.state,
+                "mutpb": self.mutpb, "mut_step": self.mut_step, "initial_diversity": initial_diversity}
+        arrays = {"population": np.asarray(population, dtype=float),
+                  "history": np.asarray(best_fits_over_time, dtype=float),
+                  "py_rng_internal": np.asarray(internal, dtype=np.uint32)}
+        if fitnesses is not None:
+            arrays["fitnesses"] = np.asarray(fitnesses, dtype=float)
+        if best_individual is not None:
+            arrays["best_individual"] = np.asarray(best_individual, dtype=float)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    def load_checkpoint(self, path):
+        # Restores the RNG states and returns (generation, population, fitnesses,
+        # best_individual, best_fitness, best_fits_over_time, operator_state);
+        # operator_state is (mutpb, mut_step, initial_diversity), or None for
+        # checkpoints written before it was saved
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["engine"] != self.engine:
+                raise ValueError(f"Checkpoint was written by the {meta['engine']} engine, not {self.engine}")
+
+            version, gauss_next = meta["py_rng"]
+            self.rng.setstate((version, tuple(int(x) for x in data["py_rng_internal"]), gauss_next))
+            self.np_rng.bit_generator.state = meta["np_rng"]
+
+            population = data["population"]
+            if self.engine != "numpy":
+                population = population.tolist()
+            fitnesses = data["fitnesses"] if "fitnesses" in data else None
+            if fitnesses is not None and self.engine != "numpy":
+                fitnesses = fitnesses.tolist()
+            best_individual = data["best_individual"].tolist() if "best_individual" in data else None
+            best_fitness = float('-inf') if meta["best_fitness"] is None else meta["best_fitness"]
+            best_fits_over_time = data["history"].tolist()
+            operator_state = None
+            if "mutpb" in meta:
+                operator_state = (meta["mutpb"], meta["mut_step"], meta["initial_diversity"])
+        return (meta["generation"], population, fitnesses, best_individual, best_fitness, best_fits_over_time,
+                operator_state)
+
+    def _copy_individual(self, ind):
+        # Best individuals are always handed back as plain lists of weights
+        return ind.tolist() if isinstance(ind, np.ndarray) else ind[:]
     
-    def run(self, expected_returns, cov_matrix, symbols=None):
+    @instrumentation.instrumented("ga.run")
+    def run(self, expected_returns, cov_matrix, symbols=None, checkpoint_path=None, checkpoint_every=10,
+            resume=False, callback=None, initial_population=None):
+        """
+        Evolve the population for ngen generations and return
+        (best_individual, best_fitness, best_fits_over_time).
+
+        With checkpoint_path set, the state is written there every
+        checkpoint_every generations. With resume=True and an existing
+        checkpoint, the run continues from it instead of starting over.
+
+        callback(generation, best_fitness, best_individual) is called after
+        every generation is evaluated. If it returns True the run stops at
+        that generation boundary and the best found so far is returned;
+        self.cancelled records whether that happened.
+
+        initial_population seeds the first generation with the given weight
+        vectors (rows); the rest of the population is random. After the run,
+        self.population and self.fitnesses hold the final population, so it
+        can warm-start a later run.
+
+        In hybrid mode the first population is partly seeded with analytic
+        solutions and elites are refined by projected-gradient steps.
+        self.evaluations_over_time holds the cumulative number of fitness
+        evaluations after each generation run by this call.
+
+        self.stop_reason records why the run ended: "ngen", "stall",
+        "diversity" or "cancelled". With adaptive=True, mutpb and mut_step
+        change during the run and are restored afterwards.
+        """
 
         if not symbols:
             symbols = cov_matrix.columns
         
         num_stocks = len(expected_returns)
-        population = [self.random_portfolio(num_stocks) for _ in range(self.pop_size)]
-        
-        best_individual = None
-        best_fitness = float('-inf')
-        best_fits_over_time = []
+        self.eval_counts = {"full": 0, "delta": 0}
+        self.cancelled = False
+        self.stop_reason = "ngen"
+        base_mutpb, base_mut_step = self.mutpb, self.mut_step
+        initial_diversity = None
+
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            (start_gen, population, fitnesses, best_individual, best_fitness,
+             best_fits_over_time, operator_state) = self.load_checkpoint(checkpoint_path)
+            if len(population[0]) != num_stocks:
+                raise ValueError("Checkpoint does not match the number of assets")
+            if self.delta_eval:
+                # The cached Cov @ w vectors aren't checkpointed; rebuild them
+                fitnesses = None
+        else:
+            start_gen = 0
+            operator_state = None
+            if self.hybrid:
+                seeds = self.analytic_population(expected_returns, cov_matrix)
+                if initial_population is not None and len(initial_population):
+                    seeds = np.vstack([seeds, np.asarray(initial_population, dtype=float)])
+                initial_population = seeds
+            population = self._init_population(num_stocks, initial_population)
+            fitnesses = None
+            
+            best_individual = None
+            best_fitness = float('-inf')
+            best_fits_over_time = []
         
-        for _ in range(self.ngen):
-            # Evaluate population
-            fitnesses = [self.evaluate(ind, expected_returns, cov_matrix) for ind in population]
+        self.evaluations_over_time = []
+        track_diversity = self.adaptive or self.min_diversity is not None
+        timing = instrumentation.enabled()
+        try:
+            if operator_state is not None:
+                # Continue from the adapted operators and the original diversity baseline
+                self.mutpb, self.mut_step, initial_diversity = operator_state
+            for gen in range(start_gen, self.ngen):
+                gen_start = time.perf_counter() if timing else 0.0
+                evals_before = self.eval_counts["full"] + self.eval_counts["delta"]
 
-            # Track best of this generation
-            gen_best_idx = np.argmax(fitnesses)
-            if fitnesses[gen_best_idx] > best_fitness:
-                best_fitness = fitnesses[gen_best_idx]
-                best_individual = population[gen_best_idx][:]
+                # Evaluate population
+                if fitnesses is None:
+                    fitnesses = self._evaluate_all(population, expected_returns, cov_matrix)
+                if self.hybrid and gen % self.refine_every == 0:
+                    self._refine_elites(population, fitnesses, expected_returns, cov_matrix)
+                eval_end = time.perf_counter() if timing else 0.0
 
-            best_fits_over_time.append(best_fitness)
+                # Track best of this generation
+                previous_best = best_fitness
+                gen_best_idx = np.argmax(fitnesses)
+                if fitnesses[gen_best_idx] > best_fitness:
+                    best_fitness = fitnesses[gen_best_idx]
+                    best_individual = self._copy_individual(population[gen_best_idx])
+
+                best_fits_over_time.append(best_fitness)
+                self.evaluations_over_time.append(self.eval_counts["full"] + self.eval_counts["delta"])
+
+                if callback is not None and callback(gen, best_fitness, best_individual):
+                    self.cancelled = True
+                    self.stop_reason = "cancelled"
+                    break
+
+                diversity_ratio = 1.0
+                if track_diversity:
+                    diversity = self.population_diversity(population)
+                    if initial_diversity is None:
+                        initial_diversity = diversity
+                    diversity_ratio = diversity / initial_diversity if initial_diversity > 0 else 0.0
+                stop_reason = self._check_stop(best_fits_over_time, diversity_ratio)
+                if stop_reason is not None:
+                    self.stop_reason = stop_reason
+                    break
+                if self.adaptive:
+                    self._adapt_operators(best_fitness - previous_best > self.stall_tolerance, diversity_ratio,
+                                          base_mutpb, base_mut_step)
             
-            # Selection and reproduction
-            new_population = []
-            for _ in range(self.pop_size // 2):
-                parent1 = self.tournament_selection(population, fitnesses, self.tourn_size)
-                parent2 = self.tournament_selection(population, fitnesses, self.tourn_size)
-                
-                if random.random() < self.cxpb:
-                    self.crossover(parent1, parent2)
-                
-                self.mutate(parent1)
-                self.mutate(parent2)
-                
-                new_population.append(parent1)
-                new_population.append(parent2)
+                # Selection and reproduction
+                population, fitnesses = self._next_generation(population, fitnesses, expected_returns, cov_matrix)
+
+                if timing:
+                    self._emit_generation_stats(gen, gen_start, eval_end, evals_before, best_fitness)
+
+                if checkpoint_path and (gen + 1) % checkpoint_every == 0:
+                    self.save_checkpoint(checkpoint_path, gen + 1, population, fitnesses, best_individual,
+                                         best_fitness, best_fits_over_time, initial_diversity)
             
-            population = new_population
+            if fitnesses is None:
+                fitnesses = self._evaluate_all(population, expected_returns, cov_matrix)
+            final_best_idx = np.argmax(fitnesses)
+            if fitnesses[final_best_idx] > best_fitness:
+                best_fitness = fitnesses[final_best_idx]
+                best_individual = self._copy_individual(population[final_best_idx])
+
+            self.population = np.asarray(population, dtype=float)
+            self.fitnesses = np.asarray(fitnesses, dtype=float)
+        finally:
+            # Adaptive mode changes these while running; restore them however the run ends
+            self.mutpb, self.mut_step = base_mutpb, base_mut_step
+
+        self.print_best(best_individual, best_fitness, symbols)
+        if self.stop_reason in ("stall", "diversity") and self.verbose:
+            print(f"Stopped early ({self.stop_reason}) after {len(best_fits_over_time)} generations")
+        if self.delta_eval and self.verbose:
+            print(f"Fitness evaluations: {self.eval_counts['delta']} delta (fast path), "
+                  f"{self.eval_counts['full']} full")
             
-        fitnesses = [self.evaluate(ind, expected_returns, cov_matrix) for ind in population]
-        final_best_idx = np.argmax(fitnesses)
-        if fitnesses[final_best_idx] > best_fitness:
-            best_fitness = fitnesses[final_best_idx]
-            best_individual = population[final_best_idx][:]
+        return best_individual, best_fitness, best_fits_over_time
+
+    ######################
+    # Efficient frontier
+    ######################
+
+    def default_risk_aversions(self, expected_returns, cov_matrix, n_points=20):
+        # Log-spaced grid, scaled to the inputs so the first points are
+        # return-seeking and the last ones close to minimum variance
+        expected_returns = np.asarray(expected_returns, dtype=float)
+        num_stocks = len(expected_returns)
+        equal_variance = portfolio_variance(np.full(num_stocks, 1.0 / num_stocks), cov_matrix)
+        spread = np.ptp(expected_returns)
+        scale = spread / equal_variance if spread > 0 and equal_variance > 0 else 1.0
+        return scale * np.logspace(-3, 0.5, n_points)
+
+    def evaluate_frontier(self, pops, expected_returns, cov_matrix, risk_aversions):
+        # Mean-variance utility w.mu - lambda/2 * w^T Cov w for a (points, pop_size,
+        # n_assets) array, with every grid point's population scored in one batch
+        n_points, pop_size, num_stocks = pops.shape
+        flat = pops.reshape(-1, num_stocks)
+        port_returns = (flat @ np.asarray(expected_returns, dtype=float)).reshape(n_points, pop_size)
+        port_variances = portfolio_variance(flat, cov_matrix).reshape(n_points, pop_size)
+        self.eval_counts["full"] += len(flat)
+        return port_returns - 0.5 * risk_aversions[:, None] * port_variances
+
+    def _breed_frontier(self, pops, fits):
+        # Tournament selection within each grid point, then the NumPy engine's
+        # crossover and mutation over all points' parents at once
+        n_points, pop_size, num_stocks = pops.shape
+        n_pairs = pop_size // 2
+        rows = np.arange(n_points)[:, None]
+        contestants = self.tournament_contestants(pop_size, (n_points, 2 * n_pairs))
+        winners = np.argmax(fits[rows[:, :, None], contestants], axis=2)
+        selected = np.take_along_axis(contestants, winners[:, :, None], axis=2)[:, :, 0]
+        parents = pops[rows, selected]
+
+        children1, children2 = self.crossover_population(parents[:, :n_pairs].reshape(-1, num_stocks),
+                                                         parents[:, n_pairs:].reshape(-1, num_stocks))
+        new_pops = np.empty_like(parents)
+        new_pops[:, 0::2] = self.mutate_population(children1).reshape(n_points, n_pairs, num_stocks)
+        new_pops[:, 1::2] = self.mutate_population(children2).reshape(n_points, n_pairs, num_stocks)
+        return new_pops
 
+    @instrumentation.instrumented("ga.run_frontier")
+    def run_frontier(self, expected_returns, cov_matrix, risk_aversions=None, n_points=20, symbols=None,
+                     migration_interval=1, callback=None):
+        """
+        Trace the efficient frontier in one run by maximizing the mean-variance
+        utility w.mu - lambda/2 * w^T Cov w for every lambda in risk_aversions
+        (default: n_points values from default_risk_aversions).
+
+        Each grid point keeps its own population of pop_size; all of them
+        evolve together for ngen generations. Every migration_interval
+        generations each point receives its neighbours' best portfolios, so
+        nearby points warm-start each other. Each point's own best portfolio
+        is carried into every generation.
+
+        callback(generation, best_fitnesses, best_individuals) gets the per-point
+        bests after each generation; returning True stops the run.
+
+        Returns a DataFrame with one row per grid point, ordered by risk
+        aversion: risk_aversion, return, volatility, sharpe and the weights.
+        """
+        if symbols is None:
+            symbols = getattr(cov_matrix, "columns", None)
+        expected_returns = np.asarray(expected_returns, dtype=float)
+        num_stocks = len(expected_returns)
+        if symbols is None:
+            symbols = range(num_stocks)
+        if risk_aversions is None:
+            risk_aversions = self.default_risk_aversions(expected_returns, cov_matrix, n_points)
+        risk_aversions = np.sort(np.asarray(risk_aversions, dtype=float))
+        n_points = len(risk_aversions)
+
+        self.eval_counts = {"full": 0, "delta": 0}
+        self.cancelled = False
+        pops = self.random_population(num_stocks, n_points * self.pop_size).reshape(n_points, self.pop_size, num_stocks)
+        best_fitnesses = np.full(n_points, -np.inf)
+        best_individuals = np.zeros((n_points, num_stocks))
+        rows = np.arange(n_points)
+
+        for gen in range(self.ngen + 1):
+            fits = self.evaluate_frontier(pops, expected_returns, cov_matrix, risk_aversions)
+            gen_best = np.argmax(fits, axis=1)
+            improved = fits[rows, gen_best] > best_fitnesses
+            best_fitnesses[improved] = fits[rows, gen_best][improved]
+            best_individuals[improved] = pops[rows, gen_best][improved]
+
+            if gen == self.ngen:
+                break
+            if callback is not None and callback(gen, best_fitnesses.copy(), best_individuals.copy()):
+                self.cancelled = True
+                break
+
+            pops = self._breed_frontier(pops, fits)
+            # Each point's elite replaces its first child, then neighbouring
+            # points' bests replace the next ones
+            pops[:, 0] = best_individuals
+            if n_points > 1 and (gen + 1) % migration_interval == 0 and self.pop_size >= 3:
+                pops[1:, 1] = best_individuals[:-1]
+                pops[:-1, 2] = best_individuals[1:]
+
+        port_returns = best_individuals @ expected_returns
+        port_vols = np.sqrt(np.maximum(portfolio_variance(best_individuals, cov_matrix), 0))
+        frontier = pd.DataFrame(best_individuals, columns=list(symbols))
+        frontier.insert(0, "risk_aversion", risk_aversions)
+        frontier.insert(1, "return", port_returns)
+        frontier.insert(2, "volatility", port_vols)
+        frontier.insert(3, "sharpe", (port_returns - self.risk_free_rate) / np.where(port_vols > 0, port_vols, 0.000001))
+        return frontier
+
+    def _emit_generation_stats(self, gen, gen_start, eval_end, evals_before, best_fitness):
+        # Evaluations done while breeding (delta_eval) count towards variation time
+        end = time.perf_counter()
+        evaluations = self.eval_counts["full"] + self.eval_counts["delta"] - evals_before
+        seconds = end - gen_start
+        instrumentation.emit(
+            "ga.generation", generation=gen, seconds=seconds, evaluations=evaluations,
+            evaluations_per_sec=evaluations / seconds if seconds > 0 else None,
+            evaluate_seconds=eval_end - gen_start, select_seconds=self._select_seconds,
+            variation_seconds=end - eval_end - self._select_seconds, best_fitness=float(best_fitness),
+        )
+
+    def print_best(self, best_individual, best_fitness, symbols):
         # Print best portfolio with symbols
+        if not self.verbose:
+            return
         print("Best Fitness (Sharpe):", best_fitness)
         print("Best Portfolio Allocation:")
         for sym, w in zip(symbols, best_individual):
             print(f"{sym}: {w:.4f}")
-            
-        return best_individual, best_fitness, best_fits_over_time
\ No newline at end of file
@@ -0,0 +1,193 @@
+import queue
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from ga.cov_ga import GeneticOptimizer
+
+
+def _share_array(arr):
+    # Copy an array into a new shared memory block; returns the block and the
+    # (name, shape, dtype) spec a worker needs to attach to it
+    arr = np.ascontiguousarray(arr, dtype=float)
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _attach_array(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _neighbors(island, n_islands, topology):
+    if n_islands == 1:
+        return []
+    if topology == "ring":
+        return [(island + 1) % n_islands]
+    return [j for j in range(n_islands) if j != island]
+
+
+def _island_worker(island, params, seed, returns_spec, cov_spec, inboxes, n_incoming, results):
+    """
+    Evolve one island with the NumPy engine, exchanging migrants every
+    migration_interval generations, and post its best result.
+    """
+    returns_shm, expected_returns = _attach_array(returns_spec)
+    cov_kind, cov_specs = cov_spec
+    cov_shms, cov_arrays = zip(*[_attach_array(spec) for spec in cov_specs])
+    # Structured covariance models are rebuilt around the shared arrays
+    cov_matrix = cov_arrays[0] if cov_kind is None else cov_kind(*cov_arrays)
+
+    try:
+        interval = params.pop("migration_interval")
+        n_migrants = params.pop("n_migrants")
+        targets = params.pop("targets")
+        opt = GeneticOptimizer(engine="numpy", seed=seed, **params)
+
+        population = opt.random_population(len(expected_returns))
+        best_individual = None
+        best_fitness = float('-inf')
+        best_fits_over_time = []
+
+        for gen in range(opt.ngen):
+            fitnesses = opt.evaluate_population(population, expected_returns, cov_matrix)
+
+            gen_best_idx = np.argmax(fitnesses)
+            if fitnesses[gen_best_idx] > best_fitness:
+                best_fitness = fitnesses[gen_best_idx]
+                best_individual = population[gen_best_idx].copy()
+            best_fits_over_time.append(best_fitness)
+
+            # Migration: send the top individuals to each neighbor and let the
+            # incoming ones replace the worst individuals of this island
+            if targets and (gen + 1) % interval == 0 and gen + 1 < opt.ngen:
+                top = np.argsort(fitnesses)[-n_migrants:]
+                for target in targets:
+                    inboxes[target].put((population[top].copy(), fitnesses[top].copy()))
+                incoming = [inboxes[island].get() for _ in range(n_incoming)]
+                migrants = np.concatenate([m for m, _ in incoming])
+                migrant_fits = np.concatenate([f for _, f in incoming])
+                migrants, migrant_fits = migrants[:len(population)], migrant_fits[:len(population)]
+
+                worst = np.argsort(fitnesses)[:len(migrants)]
+                population[worst] = migrants
+                fitnesses[worst] = migrant_fits
+
+            population = opt._breed(population, fitnesses)
+
+        fitnesses = opt.evaluate_population(population, expected_returns, cov_matrix)
+        final_best_idx = np.argmax(fitnesses)
+        if fitnesses[final_best_idx] > best_fitness:
+            best_fitness = fitnesses[final_best_idx]
+            best_individual = population[final_best_idx].copy()
+
+        results.put((island, best_individual, float(best_fitness), best_fits_over_time))
+    finally:
+        returns_shm.close()
+        for shm in cov_shms:
+            shm.close()
+
+
+class IslandGeneticOptimizer(GeneticOptimizer):
+    """
+    Island-model GA: n_islands populations of pop_size individuals evolve in
+    separate processes with the NumPy engine. Every migration_interval
+    generations each island sends its n_migrants best individuals to its
+    neighbors ('ring': the next island, 'complete': every other island), where
+    they replace the worst individuals.
+
+    Expected returns and the covariance (dense, or the arrays of a structured
+    model such as LowRankCovariance) are placed in shared memory once, so
+    workers never receive pickled copies of them.
+
+    The islands run plain generations: delta_eval, hybrid, adaptive,
+    stall_generations and min_diversity raise ValueError.
+    """
+
+    def __init__(self, n_islands=4, migration_interval=5, n_migrants=2, topology="ring", **kwargs):
+        if topology not in ("ring", "complete"):
+            raise ValueError(f"Unknown topology '{topology}', expected 'ring' or 'complete'")
+        kwargs["engine"] = "numpy"
+        super().__init__(**kwargs)
+        unsupported = [name for name in ("delta_eval", "hybrid", "adaptive", "stall_generations")
+                       if getattr(self, name)]
+        if self.min_diversity is not None:
+            unsupported.append("min_diversity")
+        if unsupported:
+            raise ValueError(f"IslandGeneticOptimizer does not support {', '.join(unsupported)}")
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.n_migrants = n_migrants
+        self.topology = topology
+
+    def run(self, expected_returns, cov_matrix, symbols=None):
+
+        if not symbols:
+            symbols = cov_matrix.columns
+
+        shms = []
+        try:
+            returns_shm, returns_spec = _share_array(expected_returns)
+            shms.append(returns_shm)
+
+            if hasattr(cov_matrix, "quad_form"):
+                cov_kind, cov_arrays = type(cov_matrix), [cov_matrix.loadings, cov_matrix.specific]
+            else:
+                cov_kind, cov_arrays = None, [np.asarray(cov_matrix, dtype=float)]
+            cov_specs = []
+            for arr in cov_arrays:
+                shm, spec = _share_array(arr)
+                shms.append(shm)
+                cov_specs.append(spec)
+
+            ctx = mp.get_context()
+            inboxes = [ctx.Queue() for _ in range(self.n_islands)]
+            results = ctx.Queue()
+            seeds = np.random.SeedSequence(self.np_rng.integers(2**63)).spawn(self.n_islands)
+            n_incoming = len(_neighbors(0, self.n_islands, self.topology))
+
+            workers = []
+            for island in range(self.n_islands):
+                params = dict(pop_size=self.pop_size, ngen=self.ngen, tourn_size=self.tourn_size,
+                              cxpb=self.cxpb, mutpb=self.mutpb, mut_step=self.mut_step,
+                              risk_free_rate=self.risk_free_rate,
+                              migration_interval=self.migration_interval,
+                              n_migrants=self.n_migrants,
+                              targets=_neighbors(island, self.n_islands, self.topology))
+                worker = ctx.Process(target=_island_worker,
+                                     args=(island, params, seeds[island], returns_spec,
+                                           (cov_kind, cov_specs), inboxes, n_incoming, results))
+                worker.start()
+                workers.append(worker)
+
+            island_results = []
+            while len(island_results) < len(workers):
+                try:
+                    island_results.append(results.get(timeout=1.0))
+                except queue.Empty:
+                    # Don't wait forever on an island that died
+                    failed = [w for w in workers if w.exitcode not in (None, 0)]
+                    if failed:
+                        for worker in workers:
+                            worker.terminate()
+                        raise RuntimeError(f"{len(failed)} island worker(s) exited unexpectedly")
+            island_results.sort(key=lambda r: r[0])
+            for worker in workers:
+                worker.join()
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+        self.island_results = [(island, fit) for island, _, fit, _ in island_results]
+
+        # Merge: the overall best-so-far at each generation is the best across islands
+        best_fits_over_time = np.max([history for _, _, _, history in island_results], axis=0).tolist()
+        _, best_individual, best_fitness, _ = max(island_results, key=lambda r: r[2])
+        best_individual = best_individual.tolist()
+
+        self.print_best(best_individual, best_fitness, symbols)
+
+        return best_individual, best_fitness, best_fits_over_time
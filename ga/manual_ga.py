@@ -12,9 +12,9 @@ MUTPB = 0.2          # Mutation probability
 MUT_STEP = 0.05      # Mutation step size
 RISK_FREE_RATE = 0.0 # Risk-free rate assumed for Sharpe ratio
 
-def random_portfolio(num_stocks):
+def random_portfolio(num_stocks, rng=random):
     """Create a random portfolio (individual) with non-negative weights summing to 1."""
-    w = [random.random() for _ in range(num_stocks)]
+    w = [rng.random() for _ in range(num_stocks)]
     total = sum(w)
     return [x/total for x in w]
 
@@ -29,21 +29,21 @@ def evaluate(individual, expected_returns, expected_vol):
     sharpe = (port_return - RISK_FREE_RATE) / port_vol
     return sharpe
 
-def tournament_selection(pop, fits, tourn_size):
+def tournament_selection(pop, fits, tourn_size, rng=random):
     """Select one individual from the population using tournament selection."""
     # Randomly choose 'tourn_size' individuals and pick the best
-    chosen = random.sample(range(len(pop)), tourn_size)
+    chosen = rng.sample(range(len(pop)), tourn_size)
     best = chosen[0]
     for c in chosen[1:]:
         if fits[c] > fits[best]:
             best = c
     return pop[best][:]  # return a copy
 
-def crossover(ind1, ind2):
+def crossover(ind1, ind2, rng=random):
     """Blend crossover: For each gene, mix the values and re-normalize."""
     size = len(ind1)
     for i in range(size):
-        alpha = random.random()
+        alpha = rng.random()
         w1, w2 = ind1[i], ind2[i]
         new_w1 = alpha * w1 + (1 - alpha) * w2
         new_w2 = alpha * w2 + (1 - alpha) * w1
@@ -52,11 +52,11 @@ def crossover(ind1, ind2):
     normalize(ind1)
     normalize(ind2)
 
-def mutate(ind):
+def mutate(ind, rng=random):
     """Mutate an individual's weights by adding small random changes and re-normalizing."""
     for i in range(len(ind)):
-        if random.random() < MUTPB:
-            ind[i] += random.uniform(-MUT_STEP, MUT_STEP)
+        if rng.random() < MUTPB:
+            ind[i] += rng.uniform(-MUT_STEP, MUT_STEP)
     # Remove negatives and normalize again
     ind[:] = [max(0, w) for w in ind]
     normalize(ind)
@@ -73,12 +73,17 @@ def normalize(ind):
         for i in range(n):
             ind[i] = 1.0 / n
 
-def run_ga(expected_returns, expected_vol):
-    """Run the genetic algorithm and return the best individual found."""
+def run_ga(expected_returns, expected_vol, seed=None):
+    """Run the genetic algorithm and return the best individual found.
+
+    All random draws come from a local random.Random(seed), so a given seed
+    reproduces the run and concurrent runs don't share RNG state.
+    """
+    rng = seed if isinstance(seed, random.Random) else random.Random(seed)
     num_stocks = len(expected_returns)
     
     # Initialize population
-    population = [random_portfolio(num_stocks) for _ in range(POP_SIZE)]
+    population = [random_portfolio(num_stocks, rng) for _ in range(POP_SIZE)]
     
     # Track the best solution
     best_individual = None
@@ -101,16 +106,16 @@ def run_ga(expected_returns, expected_vol):
         new_population = []
         for _ in range(POP_SIZE // 2):
             # Select parents
-            parent1 = tournament_selection(population, fitnesses, TOURN_SIZE)
-            parent2 = tournament_selection(population, fitnesses, TOURN_SIZE)
+            parent1 = tournament_selection(population, fitnesses, TOURN_SIZE, rng)
+            parent2 = tournament_selection(population, fitnesses, TOURN_SIZE, rng)
             
             # Crossover
-            if random.random() < CXPB:
-                crossover(parent1, parent2)
+            if rng.random() < CXPB:
+                crossover(parent1, parent2, rng)
             
             # Mutation
-            mutate(parent1)
-            mutate(parent2)
+            mutate(parent1, rng)
+            mutate(parent2, rng)
             
             new_population.append(parent1)
             new_population.append(parent2)
@@ -0,0 +1,190 @@
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from ga.cov_ga import GeneticOptimizer, portfolio_variance
+from ml import instrumentation
+
+
+def dominance_matrix(objectives):
+    # dominates[i, j] is True when row i is no worse than row j in every
+    # objective and strictly better in at least one (all minimized)
+    objectives = np.asarray(objectives, dtype=float)
+    no_worse = np.ones((len(objectives), len(objectives)), dtype=bool)
+    better = np.zeros_like(no_worse)
+    for column in objectives.T:
+        no_worse &= column[:, None] <= column[None, :]
+        better |= column[:, None] < column[None, :]
+    return no_worse & better
+
+
+def _two_objective_ranks(objectives):
+    # O(n log n) sort for two objectives: in order of the first objective,
+    # each point joins the first front whose last member doesn't dominate it
+    first, second = objectives[:, 0], objectives[:, 1]
+    ranks = np.empty(len(objectives), dtype=int)
+    tails, tail_first = [], []
+    for i in np.lexsort((second, first)).tolist():
+        f1, f2 = first[i], second[i]
+        k = bisect_left(tails, f2)
+        while k < len(tails) and tails[k] == f2 and tail_first[k] < f1:
+            k += 1
+        if k == len(tails):
+            tails.append(f2)
+            tail_first.append(f1)
+        else:
+            tails[k], tail_first[k] = f2, f1
+        ranks[i] = k
+    return ranks
+
+
+def non_dominated_sort(objectives):
+    """Pareto rank of every row (0 = non-dominated)."""
+    objectives = np.asarray(objectives, dtype=float)
+    if objectives.shape[1] == 2:
+        return _two_objective_ranks(objectives)
+
+    # Any number of objectives: peel fronts off the pairwise dominance matrix
+    dominates = dominance_matrix(objectives)
+    dominated_by = dominates.sum(axis=0)
+    ranks = np.full(len(dominated_by), -1)
+    front = np.flatnonzero(dominated_by == 0)
+    rank = 0
+    while front.size:
+        ranks[front] = rank
+        dominated_by -= dominates[front].sum(axis=0)
+        dominated_by[front] = -1
+        front = np.flatnonzero(dominated_by == 0)
+        rank += 1
+    return ranks
+
+
+def crowding_distance(objectives, ranks):
+    """Crowding distance of every row within its own front, for all fronts at once."""
+    objectives = np.asarray(objectives, dtype=float)
+    distance = np.zeros(len(objectives))
+    for column in objectives.T:
+        # Sort by front, then by this objective, so each front is one contiguous run
+        order = np.lexsort((column, ranks))
+        values, fronts = column[order], ranks[order]
+        first = np.r_[True, fronts[1:] != fronts[:-1]]
+        last = np.r_[fronts[1:] != fronts[:-1], True]
+
+        # Normalize by each front's range of this objective
+        start = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+        end = np.minimum.accumulate(np.where(last, np.arange(len(order)), len(order))[::-1])[::-1]
+        span = values[end] - values[start]
+
+        gap = np.zeros(len(order))
+        inner = ~(first | last)
+        gap[inner] = (values[2:] - values[:-2])[inner[1:-1]] / np.where(span > 0, span, 1.0)[inner]
+        gap[first | last] = np.inf
+        distance[order] += gap
+    return distance
+
+
+class NSGA2Optimizer:
+    """
+    NSGA-II over long-only, fully invested portfolios. Return and volatility
+    (and, with current_weights, turnover) are kept as separate objectives and
+    one run yields the whole Pareto front.
+
+    Selection, crossover and mutation are the NumPy engine's operators of the
+    GeneticOptimizer in self.operators, which also holds the tourn_size, cxpb,
+    mutpb and mut_step settings and the random generator.
+    """
+    def __init__(self, pop_size=200, ngen=50, tourn_size=2, cxpb=0.9, mutpb=0.2, mut_step=0.05,
+                 risk_free_rate=0.0, seed=None, verbose=True):
+        self.pop_size = pop_size
+        self.ngen = ngen
+        self.risk_free_rate = risk_free_rate
+        self.verbose = verbose
+        self.operators = GeneticOptimizer(pop_size=pop_size, ngen=ngen, tourn_size=tourn_size, cxpb=cxpb,
+                                          mutpb=mutpb, mut_step=mut_step, risk_free_rate=risk_free_rate,
+                                          engine="numpy", seed=seed, verbose=False)
+
+    def evaluate_objectives(self, pop, expected_returns, cov_matrix, current_weights=None):
+        # (pop_size, n_objectives) array, every column to be minimized
+        port_returns = pop @ expected_returns
+        port_vols = np.sqrt(np.maximum(portfolio_variance(pop, cov_matrix), 0))
+        self.eval_counts["full"] += len(pop)
+        if current_weights is None:
+            return np.column_stack([-port_returns, port_vols])
+        turnover = np.abs(pop - current_weights).sum(axis=1)
+        return np.column_stack([-port_returns, port_vols, turnover])
+
+    def survival_order(self, objectives):
+        # Individuals ordered best first by (rank, -crowding distance)
+        ranks = non_dominated_sort(objectives)
+        distance = crowding_distance(objectives, ranks)
+        return np.lexsort((-distance, ranks)), ranks
+
+    @instrumentation.instrumented("ga.nsga2")
+    def run(self, expected_returns, cov_matrix, symbols=None, current_weights=None, callback=None):
+        """
+        Evolve the population for ngen generations and return the Pareto front
+        of the final population as a DataFrame sorted by volatility, with
+        return, volatility, (turnover,) sharpe and the weights.
+
+        current_weights adds turnover away from those holdings as a third
+        objective. callback(generation, front_objectives) is called after
+        every generation with the current front's objectives; returning True
+        stops the run.
+
+        After the run, self.population, self.objectives and self.ranks hold the
+        final population.
+        """
+        if symbols is None:
+            symbols = getattr(cov_matrix, "columns", None)
+        expected_returns = np.asarray(expected_returns, dtype=float)
+        num_stocks = len(expected_returns)
+        if symbols is None:
+            symbols = range(num_stocks)
+        if current_weights is not None:
+            current_weights = np.asarray(current_weights, dtype=float)
+
+        self.eval_counts = {"full": 0, "delta": 0}
+        self.cancelled = False
+        population = self.operators.random_population(num_stocks)
+        objectives = self.evaluate_objectives(population, expected_returns, cov_matrix, current_weights)
+        order, ranks = self.survival_order(objectives)
+        population, objectives, ranks = population[order], objectives[order], ranks[order]
+
+        for gen in range(self.ngen):
+            # The population is kept best first by (rank, -crowding distance), so
+            # the crowded tournament just prefers the lower index
+            score = -np.arange(len(population), dtype=float)
+            n_pairs = self.pop_size // 2
+            parents = population[self.operators.tournament_selection_population(score, 2 * n_pairs)]
+            children1, children2 = self.operators.crossover_population(parents[:n_pairs], parents[n_pairs:])
+            children = np.vstack([self.operators.mutate_population(children1),
+                                  self.operators.mutate_population(children2)])
+
+            # Parents and children compete for the next population
+            combined = np.vstack([population, children])
+            combined_objectives = np.vstack([
+                objectives, self.evaluate_objectives(children, expected_returns, cov_matrix, current_weights)])
+            order, combined_ranks = self.survival_order(combined_objectives)
+            survivors = order[:self.pop_size]
+            population, objectives, ranks = combined[survivors], combined_objectives[survivors], combined_ranks[survivors]
+
+            if callback is not None and callback(gen, objectives[ranks == 0]):
+                self.cancelled = True
+                break
+
+        self.population, self.objectives, self.ranks = population, objectives, ranks
+        front = self.pareto_front(population[ranks == 0], objectives[ranks == 0], symbols)
+        if self.verbose:
+            print(f"Pareto front: {len(front)} portfolios, volatility "
+                  f"{front['volatility'].min():.6f} to {front['volatility'].max():.6f}")
+        return front
+
+    def pareto_front(self, weights, objectives, symbols):
+        port_returns, port_vols = -objectives[:, 0], objectives[:, 1]
+        columns = {"return": port_returns, "volatility": port_vols}
+        if objectives.shape[1] > 2:
+            columns["turnover"] = objectives[:, 2]
+        columns["sharpe"] = (port_returns - self.risk_free_rate) / np.where(port_vols > 0, port_vols, 0.000001)
+        front = pd.concat([pd.DataFrame(columns), pd.DataFrame(weights, columns=list(symbols))], axis=1)
+        return front.drop_duplicates().sort_values("volatility").reset_index(drop=True)
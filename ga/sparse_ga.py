@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+from ga.cov_ga import GeneticOptimizer
+from ml import instrumentation
+
+
+class SparseGeneticOptimizer(GeneticOptimizer):
+    """
+    GA over cardinality-constrained portfolios. Each individual is a pair of
+    arrays (asset indices, weights) holding at most max_holdings assets, each
+    with at least min_weight, so scoring it only touches the K x K block of
+    the covariance matrix.
+
+    Only the NumPy engine is supported, without delta_eval, hybrid, adaptive
+    or min_diversity; those raise ValueError.
+    """
+    def __init__(self, max_holdings=30, min_weight=0.01, add_prob=0.2, drop_prob=0.2, swap_prob=0.2, **kwargs):
+        kwargs.setdefault("engine", "numpy")
+        super().__init__(**kwargs)
+        if self.engine != "numpy":
+            raise ValueError("SparseGeneticOptimizer only supports engine='numpy'")
+        unsupported = [name for name in ("delta_eval", "hybrid", "adaptive") if getattr(self, name)]
+        if self.min_diversity is not None:
+            unsupported.append("min_diversity")
+        if unsupported:
+            raise ValueError(f"SparseGeneticOptimizer does not support {', '.join(unsupported)}")
+        if max_holdings < 1:
+            raise ValueError("max_holdings must be at least 1")
+        self.max_holdings = max_holdings
+        self.min_weight = min_weight
+        self.add_prob = add_prob
+        self.drop_prob = drop_prob
+        self.swap_prob = swap_prob
+
+    def repair(self, idx, w):
+        # Keep the max_holdings largest positions, drop those that would be
+        # under min_weight and renormalize; the largest always survives.
+        # idx must not contain repeats.
+        w = np.clip(w, 0, None)
+        order = np.argsort(-w, kind="stable")[:self.max_holdings]
+        total = w[order].sum()
+        if total <= 0:
+            return idx[order[:1]], np.ones(1)
+        keep = order[w[order] >= self.min_weight * total]
+        if len(keep) == 0:
+            keep = order[:1]
+        w = w[keep]
+        return idx[keep], w / w.sum()
+
+    def random_sparse_individual(self, num_stocks):
+        # Between max_holdings/2 and max_holdings assets, capped by the universe
+        high = min(self.max_holdings, num_stocks)
+        low = min(max(1, self.max_holdings // 2), high)
+        size = self.np_rng.integers(low, high + 1)
+        idx = self.np_rng.choice(num_stocks, size=size, replace=False)
+        return self.repair(idx, self.np_rng.random(size))
+
+    def evaluate_sparse_population(self, population, expected_returns, cov_matrix):
+        # Individuals are padded to a (pop_size, K) grid with zero weights, so
+        # the whole population is scored in one batched O(pop_size * K^2) pass
+        k = max(len(idx) for idx, _ in population)
+        indices = np.zeros((len(population), k), dtype=int)
+        weights = np.zeros((len(population), k))
+        for row, (idx, w) in enumerate(population):
+            indices[row, :len(idx)] = idx
+            weights[row, :len(w)] = w
+
+        port_returns = (weights * expected_returns[indices]).sum(axis=1)
+        if hasattr(cov_matrix, "loadings"):
+            # Low-rank models only need the held assets' rows of the loadings
+            exposures = np.einsum('pk,pkf->pf', weights, cov_matrix.loadings[indices])
+            port_variances = (exposures ** 2).sum(axis=1) + (weights ** 2 * cov_matrix.specific[indices]).sum(axis=1)
+        else:
+            blocks = cov_matrix[indices[:, :, None], indices[:, None, :]]
+            port_variances = np.einsum('pk,pkl,pl->p', weights, blocks, weights)
+        port_vols = np.sqrt(np.where(port_variances > 0, port_variances, 0.000001 ** 2))
+
+        self.eval_counts["full"] += len(population)
+        return (port_returns - self.risk_free_rate) / port_vols
+
+    def sparse_crossover(self, parent1, parent2):
+        # Blend the parents over the union of their holdings, gene by gene as in
+        # crossover(); an asset missing from one parent has weight 0 there
+        idx = np.union1d(parent1[0], parent2[0])
+        w1 = np.zeros(len(idx))
+        w2 = np.zeros(len(idx))
+        w1[np.searchsorted(idx, parent1[0])] = parent1[1]
+        w2[np.searchsorted(idx, parent2[0])] = parent2[1]
+        alpha = self.np_rng.random(len(idx))
+        return (self.repair(idx, alpha * w1 + (1 - alpha) * w2),
+                self.repair(idx, alpha * w2 + (1 - alpha) * w1))
+
+    def _unheld_asset(self, held, num_stocks):
+        # Holdings are a small fraction of the universe, so rejection sampling is cheap
+        if len(held) >= num_stocks:
+            return None
+        while True:
+            asset = self.np_rng.integers(num_stocks)
+            if asset not in held:
+                return asset
+
+    def sparse_mutate(self, individual, num_stocks):
+        idx, w = individual[0].copy(), individual[1].copy()
+
+        # Perturb weights as in perturb()
+        mask = self.np_rng.random(len(w)) < self.mutpb
+        w = w + np.where(mask, self.np_rng.uniform(-self.mut_step, self.mut_step, len(w)), 0.0)
+
+        held = set(idx.tolist())
+        if self.np_rng.random() < self.add_prob and len(idx) < self.max_holdings:
+            asset = self._unheld_asset(held, num_stocks)
+            if asset is not None:
+                idx = np.append(idx, asset)
+                w = np.append(w, self.np_rng.uniform(self.min_weight, max(2 * self.min_weight, self.mut_step)))
+                held.add(asset)
+        if self.np_rng.random() < self.drop_prob and len(idx) > 1:
+            keep = np.arange(len(idx)) != self.np_rng.integers(len(idx))
+            idx, w = idx[keep], w[keep]
+        if self.np_rng.random() < self.swap_prob:
+            asset = self._unheld_asset(held, num_stocks)
+            if asset is not None:
+                idx[self.np_rng.integers(len(idx))] = asset
+        return self.repair(idx, w)
+
+    def to_dense(self, individual, num_stocks):
+        dense = np.zeros(num_stocks)
+        dense[individual[0]] = individual[1]
+        return dense
+
+    @instrumentation.instrumented("ga.sparse")
+    def run(self, expected_returns, cov_matrix, symbols=None, callback=None):
+        """
+        Evolve the sparse population for ngen generations and return
+        (best_individual, best_fitness, best_fits_over_time), with the best
+        individual as a dense list of weights over all assets like
+        GeneticOptimizer.run. self.best_holdings holds it as a Series of the
+        held assets only.
+
+        callback and the stall criterion (stall_generations) work as in
+        GeneticOptimizer.run; self.stop_reason records why the run ended.
+        """
+        if symbols is None:
+            symbols = getattr(cov_matrix, "columns", None)
+        expected_returns = np.asarray(expected_returns, dtype=float)
+        num_stocks = len(expected_returns)
+        if symbols is None:
+            symbols = range(num_stocks)
+        if not hasattr(cov_matrix, "loadings"):
+            cov_matrix = np.asarray(cov_matrix, dtype=float)
+
+        self.eval_counts = {"full": 0, "delta": 0}
+        self.cancelled = False
+        self.stop_reason = "ngen"
+        population = [self.random_sparse_individual(num_stocks) for _ in range(self.pop_size)]
+        best_individual = None
+        best_fitness = float('-inf')
+        best_fits_over_time = []
+
+        for gen in range(self.ngen + 1):
+            fitnesses = self.evaluate_sparse_population(population, expected_returns, cov_matrix)
+            gen_best_idx = np.argmax(fitnesses)
+            if fitnesses[gen_best_idx] > best_fitness:
+                best_fitness = fitnesses[gen_best_idx]
+                best_individual = population[gen_best_idx]
+            if gen == self.ngen:
+                break
+            best_fits_over_time.append(best_fitness)
+
+            if callback is not None and callback(gen, best_fitness, self.to_dense(best_individual, num_stocks)):
+                self.cancelled = True
+                self.stop_reason = "cancelled"
+                break
+            stop_reason = self._check_stop(best_fits_over_time, 1.0)
+            if stop_reason is not None:
+                self.stop_reason = stop_reason
+                break
+
+            # Selection and reproduction
+            n_pairs = self.pop_size // 2
+            parents = self.tournament_selection_population(fitnesses, 2 * n_pairs)
+            new_population = []
+            for i in range(n_pairs):
+                child1, child2 = population[parents[i]], population[parents[n_pairs + i]]
+                if self.np_rng.random() < self.cxpb:
+                    child1, child2 = self.sparse_crossover(child1, child2)
+                new_population.append(self.sparse_mutate(child1, num_stocks))
+                new_population.append(self.sparse_mutate(child2, num_stocks))
+            population = new_population
+
+        self.population = population
+        self.fitnesses = fitnesses
+        symbols = list(symbols)
+        self.best_holdings = pd.Series(best_individual[1], index=[symbols[i] for i in best_individual[0]])
+        self.print_best(self.best_holdings.values, best_fitness, self.best_holdings.index)
+        return self.to_dense(best_individual, num_stocks).tolist(), best_fitness, best_fits_over_time
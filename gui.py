@@ -1,12 +1,20 @@
+import time
+import queue
+import argparse
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 from ga.cov_ga import GeneticOptimizer
 from ml.forecasting import calculate_forecast, compute_covariance_matrix, forecast_returns_arima
 from ml.data_preprocessing import load_data, compute_returns, normalize_returns
+from ml.data_cache import cached_symbols
+
+# How often the Tk thread checks for worker progress, and the minimum time
+# between chart redraws while an optimization is streaming
+PROGRESS_POLL_MS = 50
+REDRAW_INTERVAL = 0.2
 
 class DarkTheme:
     BG_COLOR = "#2b2b2b"
@@ -30,7 +38,7 @@ class DarkTheme:
         style.configure("TRadiobutton", foreground=cls.FG_COLOR, background=cls.FRAME_BG)
         
 class PortfolioOptimizerGUI:
-    def __init__(self, root, data_file="data/prices.csv"):
+    def __init__(self, root, data_file="data/prices.csv", service_url=None):
         self.root = root
         self.root.title("Portfolio Optimizer")
         self.root.geometry("1200x800")
@@ -44,27 +52,82 @@ class PortfolioOptimizerGUI:
         self.returns = None
         self.selected_tickers = []
         self.all_tickers = []
+        # With a running optimization service (service.py), optimizations are sent there
+        self.service = None
+        if service_url:
+            from service import OptimizationClient
+            self.service = OptimizationClient(service_url)
+        
+        # Background optimization state
+        self.worker = None
+        self.cancel_event = threading.Event()
+        self.progress_queue = queue.Queue()
+        self.fitness_history = []
+        self.last_redraw = 0.0
+        self.showing_frontier = False
         
-        # Load initial data
-        self.initial_data_load()
+        # Startup work done off the Tk thread
+        self.loading = True
+        self.startup_queue = queue.Queue()
+        self.figure = None
         
         self.create_input_frame()
         self.create_options_frame()
         self.create_parameters_frame()
         self.create_visualization_frame()
         self.create_results_frame()
+        
+        # Show the window right away; data and the chart load in the background
+        threading.Thread(target=self.initial_data_load, daemon=True).start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_startup)
 
     def initial_data_load(self):
-        """Load the initial dataset and get all available tickers."""
+        """
+        Runs in a background thread at startup. Publishes the ticker list from the
+        cache's symbol index as soon as possible, then the full price matrix.
+        """
         try:
-            initial_data = load_data(self.data_file)
-            self.all_tickers = list(initial_data.columns)
-            self.data = initial_data
-            self.returns = compute_returns(self.data)
-            self.selected_tickers = self.all_tickers
+            tickers = cached_symbols(self.data_file)
+            if tickers is not None:
+                self.startup_queue.put(("tickers", tickers))
+            
+            # Import matplotlib here so the Tk thread only has to build the figure
+            import matplotlib.pyplot
+            import matplotlib.backends.backend_tkagg
+            self.startup_queue.put(("chart",))
+            
+            initial_data = load_data(self.data_file, use_cache=True)
+            self.startup_queue.put(("data", initial_data, compute_returns(initial_data)))
         except Exception as e:
-            messagebox.showerror("Error", f"Error loading initial data: {str(e)}")
-            self.root.destroy()  # Exit if we can't load the data
+            self.startup_queue.put(("error", str(e)))
+            
+    def poll_startup(self):
+        """Apply the background startup results on the Tk thread."""
+        try:
+            while True:
+                message = self.startup_queue.get_nowait()
+                if message[0] == "tickers":
+                    self.all_tickers = message[1]
+                    self.selected_tickers = self.all_tickers
+                    self.ticker_count_label.config(text=f"Selected: {len(self.selected_tickers)} tickers (loading prices...)")
+                elif message[0] == "chart":
+                    self.create_chart()
+                elif message[0] == "data":
+                    _, initial_data, returns = message
+                    self.all_tickers = list(initial_data.columns)
+                    self.data = initial_data
+                    self.returns = returns
+                    self.selected_tickers = self.all_tickers
+                    self.loading = False
+                    self.ticker_count_label.config(text=f"Selected: {len(self.selected_tickers)} tickers")
+                    return
+                else:
+                    messagebox.showerror("Error", f"Error loading initial data: {message[1]}")
+                    self.root.destroy()  # Exit if we can't load the data
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(PROGRESS_POLL_MS, self.poll_startup)
         
     def create_input_frame(self):
         input_frame = ttk.LabelFrame(self.root, text="Data Selection", padding="5")
@@ -82,7 +145,7 @@ class PortfolioOptimizerGUI:
         ttk.Button(input_frame, text="Show All Tickers", command=self.show_all_tickers).grid(row=0, column=3, padx=5, pady=5)
         
         # Display current selection
-        self.ticker_count_label = ttk.Label(input_frame, text=f"Selected: {len(self.selected_tickers)} tickers")
+        self.ticker_count_label = ttk.Label(input_frame, text="Loading tickers...")
         self.ticker_count_label.grid(row=1, column=0, columnspan=4, padx=5, pady=5)
 
     def filter_tickers(self):
@@ -92,6 +155,9 @@ class PortfolioOptimizerGUI:
         if not tickers:
             messagebox.showwarning("Warning", "Please enter at least one ticker")
             return
+        if self.loading:
+            messagebox.showwarning("Warning", "Data is still loading")
+            return
             
         # Validate tickers
         valid_tickers = [t for t in tickers if t in self.all_tickers]
@@ -102,7 +168,7 @@ class PortfolioOptimizerGUI:
         
         if valid_tickers:
             try:
-                self.data = load_data(self.data_file, valid_tickers)
+                self.data = load_data(self.data_file, valid_tickers, use_cache=True)
                 self.returns = compute_returns(self.data)
                 self.selected_tickers = valid_tickers
                 self.ticker_count_label.config(text=f"Selected: {len(self.selected_tickers)} tickers")
@@ -112,8 +178,11 @@ class PortfolioOptimizerGUI:
                 
     def show_all_tickers(self):
         """Reset to show all available tickers."""
+        if self.loading:
+            messagebox.showwarning("Warning", "Data is still loading")
+            return
         try:
-            self.data = load_data(self.data_file)
+            self.data = load_data(self.data_file, use_cache=True)
             self.returns = compute_returns(self.data)
             self.selected_tickers = self.all_tickers
             self.ticker_entry.delete(0, tk.END)
@@ -174,13 +243,29 @@ class PortfolioOptimizerGUI:
         self.rf_rate_var = tk.StringVar(value="0.0")
         ttk.Entry(param_frame, textvariable=self.rf_rate_var, width=10).grid(row=2, column=3, padx=5, pady=5)
         
-        # Run button
-        ttk.Button(param_frame, text="Optimize Portfolio", command=self.run_optimization).grid(row=3, column=0, columnspan=4, pady=10)
+        # Run and cancel buttons
+        self.run_button = ttk.Button(param_frame, text="Optimize Portfolio", command=self.run_optimization)
+        self.run_button.grid(row=3, column=0, columnspan=2, pady=10)
+        self.cancel_button = ttk.Button(param_frame, text="Cancel", command=self.cancel_optimization, state=tk.DISABLED)
+        self.cancel_button.grid(row=3, column=2, columnspan=2, pady=10)
+        self.frontier_button = ttk.Button(param_frame, text="Efficient Frontier", command=self.run_frontier)
+        self.frontier_button.grid(row=4, column=0, columnspan=4, pady=(0, 10))
         
     def create_visualization_frame(self):
         self.viz_frame = ttk.LabelFrame(self.root, text="Optimization Progress", padding="5")
         self.viz_frame.grid(row=0, column=1, rowspan=3, padx=5, pady=5, sticky="nsew")
         
+        # Placeholder until matplotlib is loaded and create_chart() runs
+        self.chart_placeholder = ttk.Label(self.viz_frame, text="Loading chart...")
+        self.chart_placeholder.pack(fill=tk.BOTH, expand=True)
+        
+    def create_chart(self):
+        if self.figure is not None:
+            return
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        
+        self.chart_placeholder.destroy()
         plt.style.use('dark_background')
         self.figure, self.ax = plt.subplots(figsize=(8, 6))
         self.figure.patch.set_facecolor(DarkTheme.BG_COLOR)
@@ -202,7 +287,7 @@ class PortfolioOptimizerGUI:
         if file_path:
             try:
                 tickers = [t.strip() for t in self.ticker_entry.get().split(",") if t.strip()]
-                self.data = load_data(file_path, tickers if tickers else None)
+                self.data = load_data(file_path, tickers if tickers else None, use_cache=True)
                 self.returns = compute_returns(self.data)
                 self.selected_tickers = list(self.data.columns)
                 messagebox.showinfo("Success", f"Loaded data for {len(self.selected_tickers)} stocks")
@@ -210,64 +295,243 @@ class PortfolioOptimizerGUI:
                 messagebox.showerror("Error", f"Error loading data: {str(e)}")
     
     def run_optimization(self):
+        """Start the forecast and GA in a background thread and stream its progress."""
+        self.start_worker(self.service_worker if self.service else self.optimization_worker)
+        
+    def run_frontier(self):
+        """Sweep the efficient frontier in the background with the same settings."""
+        self.start_worker(self.frontier_worker)
+        
+    def start_worker(self, target):
         if self.data is None:
-            messagebox.showerror("Error", "Please load data first")
+            messagebox.showerror("Error", "Data is still loading" if self.loading else "Please load data first")
+            return
+        if self.worker is not None and self.worker.is_alive():
             return
             
         try:
-            # Process returns based on normalization option
-            processed_returns = normalize_returns(self.returns) if self.normalize_returns_var.get() else self.returns
-            
-            # Calculate expected returns based on selected method
-            if self.forecast_method.get() == "arima":
-                expected_returns, _ = calculate_forecast(processed_returns)
-                expected_returns = expected_returns.values
-            else:
-                expected_returns = forecast_returns_arima(processed_returns)
-            
-            # Get parameters from GUI
-            optimizer = GeneticOptimizer(
-                pop_size=int(self.pop_size_var.get()),
-                ngen=int(self.ngen_var.get()),
-                tourn_size=int(self.tourn_size_var.get()),
-                cxpb=float(self.cxpb_var.get()),
-                mutpb=float(self.mutpb_var.get()),
-                risk_free_rate=float(self.rf_rate_var.get())
-            )
+            # Read every Tk variable here; the worker thread must not touch widgets
+            settings = {
+                "returns": self.returns,
+                "tickers": list(self.selected_tickers),
+                "normalize": self.normalize_returns_var.get(),
+                "forecast_method": self.forecast_method.get(),
+                "optimizer": dict(
+                    pop_size=int(self.pop_size_var.get()),
+                    ngen=int(self.ngen_var.get()),
+                    tourn_size=int(self.tourn_size_var.get()),
+                    cxpb=float(self.cxpb_var.get()),
+                    mutpb=float(self.mutpb_var.get()),
+                    risk_free_rate=float(self.rf_rate_var.get()),
+                    engine="numpy"
+                ),
+            }
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid parameter: {str(e)}")
+            return
+        
+        self.start_progress_plot(settings["optimizer"]["ngen"])
+        self.cancel_event.clear()
+        self.run_button.config(state=tk.DISABLED)
+        self.frontier_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        
+        self.worker = threading.Thread(target=target, args=(settings,), daemon=True)
+        self.worker.start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+        
+    def cancel_optimization(self):
+        """Ask the running optimization to stop at the next generation boundary."""
+        self.cancel_event.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        
+    def prepare_inputs(self, settings):
+        # Process returns based on normalization option
+        processed_returns = normalize_returns(settings["returns"]) if settings["normalize"] else settings["returns"]
+        
+        # Calculate expected returns based on selected method
+        if settings["forecast_method"] == "arima":
+            expected_returns, _ = calculate_forecast(processed_returns)
+            expected_returns = expected_returns.values
+        else:
+            expected_returns = forecast_returns_arima(processed_returns, method="ols")
+        
+        return expected_returns, compute_covariance_matrix(processed_returns)
+        
+    def optimization_worker(self, settings):
+        """Runs in the background thread; reports back through progress_queue only."""
+        try:
+            expected_returns, cov_matrix = self.prepare_inputs(settings)
+            optimizer = GeneticOptimizer(**settings["optimizer"])
             
-            cov_matrix = compute_covariance_matrix(processed_returns)
+            def on_generation(gen, best_fitness, best_individual):
+                self.progress_queue.put(("progress", gen, best_fitness))
+                return self.cancel_event.is_set()
             
             # Run optimization
             best_portfolio, best_fitness, fitness_history = optimizer.run(
                 expected_returns,
                 cov_matrix.values,
-                self.selected_tickers
+                settings["tickers"],
+                callback=on_generation
             )
+            self.progress_queue.put(("done", settings, best_portfolio, best_fitness, optimizer.stop_reason))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
             
-            # Update visualization
-            self.ax.clear()
-            self.ax.plot(fitness_history, color='#00ff00')
-            self.ax.set_xlabel("Generation")
-            self.ax.set_ylabel("Best Sharpe Ratio")
-            self.ax.set_title("Optimization Progress")
-            self.ax.grid(True, linestyle='--', alpha=0.3)
-            self.canvas.draw()
+    def service_worker(self, settings):
+        """Runs the optimization on the optimization service, relaying its progress."""
+        try:
+            # Same forecast mapping as prepare_inputs
+            if settings["forecast_method"] == "arima":
+                forecast = {"forecast": "default"}
+            else:
+                forecast = {"forecast": "arima", "arima_method": "ols"}
+            # The full universe is kept warm by the service; only send a filter
+            tickers = None if settings["tickers"] == self.all_tickers else settings["tickers"]
+            job_id = self.service.submit(tickers=tickers, normalize=settings["normalize"],
+                                         optimizer=settings["optimizer"], **forecast)
             
-            # Update results
-            self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(tk.END, f"Best Sharpe Ratio: {best_fitness:.4f}\n")
-            self.results_text.insert(tk.END, f"Forecast Method: {self.forecast_method.get().upper()}\n")
-            self.results_text.insert(tk.END, f"Using Normalized Returns: {self.normalize_returns_var.get()}\n\n")
-            self.results_text.insert(tk.END, "Optimal Portfolio Weights:\n")
-            for ticker, weight in zip(self.selected_tickers, best_portfolio):
-                self.results_text.insert(tk.END, f"{ticker}: {weight:.4f}\n")
-
+            received = 0
+            cancel_sent = False
+            while True:
+                status = self.service.status(job_id, since=received)
+                for fitness in status["history"]:
+                    self.progress_queue.put(("progress", received, fitness))
+                    received += 1
+                if status["status"] not in ("queued", "running"):
+                    break
+                if self.cancel_event.is_set() and not cancel_sent:
+                    self.service.cancel(job_id)
+                    cancel_sent = True
+                time.sleep(PROGRESS_POLL_MS / 1000)
+            
+            result = status["result"]
+            if status["status"] == "error":
+                raise RuntimeError(status["error"])
+            if result is None:
+                raise RuntimeError("Cancelled before it started")
+            settings = {**settings, "tickers": list(result["weights"])}
+            self.progress_queue.put(("done", settings, list(result["weights"].values()), result["sharpe"],
+                                     result["stop_reason"]))
         except Exception as e:
-            messagebox.showerror("Error", f"Error during optimization: {str(e)}")
+            self.progress_queue.put(("error", str(e)))
+            
+    def frontier_worker(self, settings):
+        """Background frontier sweep; progress reports the best Sharpe ratio on the frontier."""
+        try:
+            expected_returns, cov_matrix = self.prepare_inputs(settings)
+            optimizer = GeneticOptimizer(**settings["optimizer"])
+            
+            def on_generation(gen, best_fitnesses, best_individuals):
+                sharpe = optimizer.evaluate_population(best_individuals, expected_returns, cov_matrix.values).max()
+                self.progress_queue.put(("progress", gen, sharpe))
+                return self.cancel_event.is_set()
+            
+            frontier = optimizer.run_frontier(expected_returns, cov_matrix.values, symbols=settings["tickers"],
+                                              callback=on_generation)
+            self.progress_queue.put(("frontier", settings, frontier, optimizer.cancelled))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
+            
+    def poll_progress(self):
+        """Drain worker messages on the Tk thread, redrawing the chart at most every REDRAW_INTERVAL."""
+        finished = False
+        try:
+            while True:
+                message = self.progress_queue.get_nowait()
+                if message[0] == "progress":
+                    self.fitness_history.append(message[2])
+                elif message[0] == "done":
+                    self.show_results(*message[1:])
+                    finished = True
+                elif message[0] == "frontier":
+                    self.show_frontier(*message[1:])
+                    finished = True
+                else:
+                    messagebox.showerror("Error", f"Error during optimization: {message[1]}")
+                    finished = True
+        except queue.Empty:
+            pass
+        
+        now = time.monotonic()
+        if finished and self.showing_frontier:
+            self.canvas.draw_idle()
+        elif finished or now - self.last_redraw >= REDRAW_INTERVAL:
+            self.update_progress_plot()
+            self.last_redraw = now
+        
+        if finished:
+            self.run_button.config(state=tk.NORMAL)
+            self.frontier_button.config(state=tk.NORMAL)
+            self.cancel_button.config(state=tk.DISABLED)
+        else:
+            self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+            
+    def start_progress_plot(self, ngen):
+        # The axes are set up once per run; progress only updates the line's data
+        self.create_chart()
+        self.showing_frontier = False
+        self.fitness_history = []
+        self.ax.clear()
+        self.fitness_line, = self.ax.plot([], [], color='#00ff00')
+        self.ax.set_xlim(0, max(ngen - 1, 1))
+        self.ax.set_xlabel("Generation")
+        self.ax.set_ylabel("Best Sharpe Ratio")
+        self.ax.set_title("Optimization Progress")
+        self.ax.grid(True, linestyle='--', alpha=0.3)
+        self.canvas.draw_idle()
+        
+    def update_progress_plot(self):
+        self.fitness_line.set_data(range(len(self.fitness_history)), self.fitness_history)
+        if self.fitness_history:
+            self.ax.relim()
+            self.ax.autoscale_view(scalex=False)
+        self.canvas.draw_idle()
+        
+    def show_results(self, settings, best_portfolio, best_fitness, stop_reason):
+        self.results_text.delete(1.0, tk.END)
+        if stop_reason == "cancelled":
+            self.results_text.insert(tk.END, f"Cancelled after {len(self.fitness_history)} generations\n")
+        elif stop_reason != "ngen":
+            self.results_text.insert(tk.END, f"Converged ({stop_reason}) after {len(self.fitness_history)} generations\n")
+        self.results_text.insert(tk.END, f"Best Sharpe Ratio: {best_fitness:.4f}\n")
+        self.results_text.insert(tk.END, f"Forecast Method: {settings['forecast_method'].upper()}\n")
+        self.results_text.insert(tk.END, f"Using Normalized Returns: {settings['normalize']}\n\n")
+        self.results_text.insert(tk.END, "Optimal Portfolio Weights:\n")
+        for ticker, weight in zip(settings["tickers"], best_portfolio):
+            self.results_text.insert(tk.END, f"{ticker}: {weight:.4f}\n")
+
+    def show_frontier(self, settings, frontier, cancelled):
+        # Replace the progress chart with the frontier, marking the max-Sharpe point
+        self.showing_frontier = True
+        best = frontier["sharpe"].idxmax()
+        self.ax.clear()
+        self.ax.plot(frontier["volatility"], frontier["return"], 'o-', color='#00ff00')
+        self.ax.plot(frontier.at[best, "volatility"], frontier.at[best, "return"], '*', color='#ffcc00', markersize=14)
+        self.ax.set_xlabel("Volatility")
+        self.ax.set_ylabel("Expected Return")
+        self.ax.set_title("Efficient Frontier")
+        self.ax.grid(True, linestyle='--', alpha=0.3)
+        
+        self.results_text.delete(1.0, tk.END)
+        if cancelled:
+            self.results_text.insert(tk.END, f"Cancelled after {len(self.fitness_history)} generations\n")
+        self.results_text.insert(tk.END, f"{'Risk Aversion':>14} {'Return':>10} {'Volatility':>10} {'Sharpe':>8}  Top Holdings\n")
+        for _, row in frontier.iterrows():
+            weights = row[settings["tickers"]].astype(float).nlargest(3)
+            holdings = ", ".join(f"{ticker} {weight:.2f}" for ticker, weight in weights.items())
+            self.results_text.insert(tk.END, f"{row['risk_aversion']:>14.4g} {row['return']:>10.6f} "
+                                             f"{row['volatility']:>10.6f} {row['sharpe']:>8.4f}  {holdings}\n")
 
 def main():
+    parser = argparse.ArgumentParser(description="Portfolio optimizer GUI")
+    parser.add_argument("--data", default="data/prices.csv", help="long-format price CSV")
+    parser.add_argument("--service", help="URL of a running optimization service, e.g. http://127.0.0.1:8765")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = PortfolioOptimizerGUI(root)
+    app = PortfolioOptimizerGUI(root, args.data, args.service)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+import pandas as pd
+import numpy as np
+
+
+class LowRankCovariance:
+    """
+    Covariance matrix stored as loadings @ loadings.T + diag(specific).
+
+    With N assets and K columns of loadings, scoring a portfolio costs O(NK)
+    and the dense N x N matrix is never built. GeneticOptimizer uses
+    quad_form() directly when it is given one of these instead of a matrix.
+    """
+
+    def __init__(self, loadings, specific, columns=None):
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.specific = np.asarray(specific, dtype=float)
+        n = self.loadings.shape[0]
+        self.columns = pd.Index(range(n) if columns is None else columns)
+
+    @property
+    def shape(self):
+        n = self.loadings.shape[0]
+        return (n, n)
+
+    @property
+    def n_factors(self):
+        return self.loadings.shape[1]
+
+    def dot(self, w):
+        """
+        Cov @ w for one portfolio, or for every row of a (pop_size, N) array.
+        """
+        w = np.asarray(w, dtype=float)
+        return (w @ self.loadings) @ self.loadings.T + w * self.specific
+
+    def quad_form(self, w):
+        """
+        w^T * Cov * w for one portfolio, or row-wise for a (pop_size, N) array.
+        """
+        w = np.asarray(w, dtype=float)
+        return ((w @ self.loadings) ** 2).sum(axis=-1) + (w ** 2) @ self.specific
+
+    def columns_dot(self, idx, delta):
+        """
+        Cov[:, idx] @ delta, the change in Cov @ w when w[idx] changes by delta.
+        """
+        out = self.loadings @ (self.loadings[idx].T @ delta)
+        out[idx] += self.specific[idx] * delta
+        return out
+
+    def solve(self, b):
+        """
+        Cov^-1 @ b via the Woodbury identity, in O(NK^2).
+        """
+        b = np.asarray(b, dtype=float)
+        d_inv = 1.0 / self.specific
+        scaled = self.loadings * d_inv[:, None]
+        inner = np.eye(self.n_factors) + self.loadings.T @ scaled
+        return d_inv * b - scaled @ np.linalg.solve(inner, scaled.T @ b)
+
+    def to_dense(self):
+        cov = self.loadings @ self.loadings.T
+        cov[np.diag_indices_from(cov)] += self.specific
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+
+def ledoit_wolf_covariance(returns):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+
+    The sample part of the shrunk matrix (1 - delta) * S + delta * mu * I is
+    spanned by the T centered observations. With fewer observations than assets
+    (T < N) it is kept in low-rank form, with the scaled, centered returns as
+    the N x T loadings and delta * mu as the diagonal. Otherwise K = T would
+    cost as much as the dense matrix or more, so the dense N x N DataFrame is
+    returned. Only factor_covariance gives an O(NK) model with K << N.
+    """
+    # Imported here so that scikit-learn only loads when shrinkage is used
+    from sklearn.covariance import ledoit_wolf_shrinkage
+
+    X = returns.to_numpy(dtype=float)
+    n_obs, n_assets = X.shape
+    centered = X - X.mean(axis=0)
+
+    shrinkage = ledoit_wolf_shrinkage(centered, assume_centered=True)
+    mu = (centered ** 2).sum() / (n_obs * n_assets)
+
+    if n_obs >= n_assets:
+        cov = (1 - shrinkage) / n_obs * (centered.T @ centered)
+        cov[np.diag_indices_from(cov)] += shrinkage * mu
+        return pd.DataFrame(cov, index=returns.columns, columns=returns.columns)
+
+    loadings = np.sqrt((1 - shrinkage) / n_obs) * centered.T
+    return LowRankCovariance(loadings, np.full(n_assets, shrinkage * mu), returns.columns)
+
+
+def factor_covariance(returns, n_factors=10):
+    """
+    K-factor "low-rank + diagonal" covariance from the leading principal components.
+
+    The top n_factors components of the sample covariance give the loadings; the
+    residual variance of each asset gives the diagonal, so the diagonal of the
+    model matches the sample variances.
+    """
+    X = returns.to_numpy(dtype=float)
+    n_obs = X.shape[0]
+    centered = X - X.mean(axis=0)
+
+    _, singular_values, components = np.linalg.svd(centered, full_matrices=False)
+    n_factors = min(n_factors, len(singular_values))
+    loadings = components[:n_factors].T * (singular_values[:n_factors] / np.sqrt(n_obs - 1))
+
+    variances = (centered ** 2).sum(axis=0) / (n_obs - 1)
+    specific = variances - (loadings ** 2).sum(axis=1)
+    # Keep the diagonal strictly positive so the model stays invertible
+    specific = np.maximum(specific, 1e-10 * variances.mean())
+    return LowRankCovariance(loadings, specific, returns.columns)
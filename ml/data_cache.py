@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import pandas as pd
+import numpy as np
+
+# Bump when the on-disk layout changes so stale caches are rebuilt
+CACHE_VERSION = 1
+
+_META_FILE = "meta.json"
+_VALUES_FILE = "values.npy"
+_DATES_FILE = "dates.npy"
+_SYMBOLS_FILE = "symbols.npy"
+
+
+def default_cache_dir(file_path):
+    """
+    Cache directory used for a CSV when none is given: a hidden folder next to it.
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.cache")
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """
+    SHA-1 of the file contents, read in blocks so large files aren't loaded at once.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_key(file_path):
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, _META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    tmp_path = os.path.join(cache_dir, _META_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(cache_dir, _META_FILE))
+
+
+def is_cache_valid(file_path, cache_dir=None):
+    """
+    Check whether the cache still matches the CSV.
+
+    Size and mtime are compared first. When only the mtime changed the contents
+    are hashed, so a touched but unchanged file keeps its cache.
+    """
+    cache_dir = cache_dir or default_cache_dir(file_path)
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+
+    key = _source_key(file_path)
+    if key["size"] != meta["size"]:
+        return False
+    if key["mtime_ns"] == meta["mtime_ns"]:
+        return True
+    if file_hash(file_path) != meta["sha1"]:
+        return False
+
+    meta["mtime_ns"] = key["mtime_ns"]
+    _write_meta(cache_dir, meta)
+    return True
+
+
+def cached_symbols(file_path, cache_dir=None):
+    """
+    Symbols stored in the cache if it is still valid for the CSV, else None.
+    Only the small symbol index is read; the cache is never built here.
+    """
+    cache_dir = cache_dir or default_cache_dir(file_path)
+    if not is_cache_valid(file_path, cache_dir):
+        return None
+    return np.load(os.path.join(cache_dir, _SYMBOLS_FILE)).tolist()
+
+
+def build_cache(file_path, cache_dir=None):
+    """
+    Parse the long-format CSV once and store the pivoted close prices.
+
+    Prices are stored as a (symbols, dates) float64 array so every ticker is one
+    contiguous row that can be read through a memory map. Missing values are kept;
+    forward-filling happens after tickers are selected, as in load_data.
+    """
+    cache_dir = cache_dir or default_cache_dir(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Key the cache on the file as it was before parsing started
+    key = _source_key(file_path)
+    sha1 = file_hash(file_path)
+
+    df = pd.read_csv(file_path, usecols=["date", "symbol", "close"])
+    df['date'] = pd.to_datetime(df['date'], format='mixed')
+    df_pivoted = df.pivot(index="date", columns="symbol", values="close").sort_index()
+
+    # Drop the old metadata first so a half-written cache is never considered valid
+    if os.path.exists(os.path.join(cache_dir, _META_FILE)):
+        os.remove(os.path.join(cache_dir, _META_FILE))
+    np.save(os.path.join(cache_dir, _VALUES_FILE),
+            np.ascontiguousarray(df_pivoted.to_numpy(dtype=np.float64).T))
+    np.save(os.path.join(cache_dir, _DATES_FILE), df_pivoted.index.to_numpy(dtype="datetime64[ns]"))
+    np.save(os.path.join(cache_dir, _SYMBOLS_FILE), df_pivoted.columns.to_numpy(dtype=str))
+
+    _write_meta(cache_dir, {"version": CACHE_VERSION, "source": os.path.abspath(file_path),
+                            "sha1": sha1, **key})
+    return cache_dir
+
+
+def load_cached(file_path, tickers=None, cache_dir=None):
+    """
+    Return the pivoted close prices for `tickers` (all when None) from the cache,
+    rebuilding it first if the CSV changed. Only the selected tickers' rows are
+    read from the memory-mapped price array.
+
+    The frame is not forward-filled; dates on which none of the selected tickers
+    traded are dropped, matching a pivot of the filtered CSV.
+    """
+    cache_dir = cache_dir or default_cache_dir(file_path)
+    if not is_cache_valid(file_path, cache_dir):
+        build_cache(file_path, cache_dir)
+
+    symbols = np.load(os.path.join(cache_dir, _SYMBOLS_FILE))
+    dates = np.load(os.path.join(cache_dir, _DATES_FILE))
+    values = np.load(os.path.join(cache_dir, _VALUES_FILE), mmap_mode="r")
+
+    if tickers:
+        idx = np.flatnonzero(np.isin(symbols, list(tickers)))
+        prices = np.asarray(values[idx]).T
+        symbols = symbols[idx]
+    else:
+        prices = np.asarray(values).T
+
+    df = pd.DataFrame(prices,
+                      index=pd.DatetimeIndex(dates, name="date"),
+                      columns=pd.Index(symbols, name="symbol"))
+    if tickers:
+        df = df.dropna(how="all")
+    return df
@@ -1,32 +1,91 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
+from ml.data_cache import load_cached
+from ml.instrumentation import stage, instrumented
 
-def load_data(file_path, tickers=None):
+def _load_pivot_chunked(file_path, tickers, chunksize, price_dtype):
+    """
+    Stream the CSV in chunks, keeping only date/symbol/close of the selected tickers.
+
+    Symbols are parsed as a categorical; when tickers are given its categories are
+    the tickers, so every other symbol becomes NaN at parse time and is dropped
+    before dates are parsed. Each chunk is pivoted on its own, so memory scales
+    with the selected universe rather than with the file.
+    """
+    symbol_dtype = pd.CategoricalDtype(sorted(set(tickers))) if tickers else "category"
+    reader = pd.read_csv(file_path, usecols=["date", "symbol", "close"], chunksize=chunksize,
+                         dtype={"date": str, "symbol": symbol_dtype, "close": price_dtype})
+
+    pieces = []
+    for chunk in reader:
+        chunk = chunk.dropna(subset=["symbol"])
+        if chunk.empty:
+            continue
+        chunk["symbol"] = chunk["symbol"].astype(str)
+        with stage("load_data.parse_dates"):
+            chunk["date"] = pd.to_datetime(chunk["date"], format='mixed')
+        with stage("load_data.pivot"):
+            pieces.append(chunk.pivot(index="date", columns="symbol", values="close"))
+
+    if not pieces:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="date"),
+                            columns=pd.Index([], name="symbol"), dtype=price_dtype)
+
+    # A date can be split across two chunks; merge its partial rows
+    df_pivoted = pd.concat(pieces).groupby(level=0).first()
+    return df_pivoted.reindex(columns=sorted(df_pivoted.columns))
+
+@instrumented("load_data")
+def load_data(file_path, tickers=None, use_cache=False, cache_dir=None, chunksize=None, price_dtype="float64"):
     """
     Load a CSV file from the given file_path and filter by the given tickers if provided.
+
+    With use_cache=True the CSV is parsed and pivoted once into an on-disk cache
+    (see ml.data_cache); later loads only select the tickers' columns from it. The
+    cache is rebuilt automatically when the CSV changes.
+
+    With chunksize set (and no cache) the CSV is streamed chunksize rows at a time
+    and unselected tickers are dropped chunk by chunk, which keeps peak memory low
+    on large files. price_dtype sets the dtype of the returned prices, e.g. 'float32'.
     """
-    df = pd.read_csv(file_path)
-    df['date'] = pd.to_datetime(df['date'], format='mixed')
-    
-    if tickers:
-        df = df[df["symbol"].isin(tickers)]
+    if use_cache:
+        with stage("load_data.cache"):
+            df_pivoted = load_cached(file_path, tickers, cache_dir)
+    elif chunksize:
+        with stage("load_data.chunked_read"):
+            df_pivoted = _load_pivot_chunked(file_path, tickers, chunksize, price_dtype)
+    else:
+        with stage("load_data.read_csv"):
+            df = pd.read_csv(file_path)
+        with stage("load_data.parse_dates"):
+            df['date'] = pd.to_datetime(df['date'], format='mixed')
         
-    df_pivoted = df.pivot(index="date", columns="symbol", values="close")
+        if tickers:
+            df = df[df["symbol"].isin(tickers)]
+            
+        with stage("load_data.pivot"):
+            df_pivoted = df.pivot(index="date", columns="symbol", values="close")
     
     # Sort the index and drop any NaN values
-    df_pivoted = df_pivoted.sort_index()
-    df_pivoted = df_pivoted.fillna(method='ffill').dropna()
+    with stage("load_data.clean"):
+        df_pivoted = df_pivoted.sort_index()
+        df_pivoted = df_pivoted.fillna(method='ffill').dropna()
+        df_pivoted = df_pivoted.astype(price_dtype, copy=False)
     
     return df_pivoted
     
+@instrumented("compute_returns")
 def compute_returns(df):
     return df.pct_change().dropna()
 
+@instrumented("normalize_returns")
 def normalize_returns(df):
     """
     Normalize the returns to have mean 0 and std 1 using StandardScaler.
     """
+    # Imported here so that scikit-learn only loads when normalization is used
+    from sklearn.preprocessing import StandardScaler
+
     scaler = StandardScaler()
     scaled_returns = pd.DataFrame(scaler.fit_transform(df), 
                               index=df.index, 
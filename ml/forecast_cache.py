@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+
+# Bump when the index layout changes so old caches are ignored
+CACHE_VERSION = 1
+
+_INDEX_FILE = "forecasts.json"
+
+
+def default_forecast_cache_dir(file_path):
+    """
+    Forecast cache directory for a price CSV: a hidden folder next to it.
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.forecasts")
+
+
+def series_hash(values):
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+
+class ForecastCache:
+    """
+    On-disk cache of per-ticker forecasts.
+
+    Entries are keyed by ticker, model order, method, horizon, preprocessing
+    options and a hash of the fitted series. Each entry also keeps the fitted
+    parameters, so a series that only gained new observations at the end can
+    be refit starting from them. The index is loaded on first use and written
+    by save(); once it grows past max_bytes, the least recently used entries
+    are dropped.
+    """
+
+    def __init__(self, directory, max_bytes=8 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "warm_starts": 0, "misses": 0}
+        self._entries = None
+        self._groups = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(os.path.join(self.directory, _INDEX_FILE)) as f:
+                index = json.load(f)
+            entries = index["entries"] if index.get("version") == CACHE_VERSION else {}
+        except (OSError, ValueError, KeyError):
+            entries = {}
+        self._entries = entries
+        self._groups = {}
+        for key, entry in entries.items():
+            self._groups.setdefault(entry["group"], []).append(key)
+
+    @staticmethod
+    def _group(ticker, order, method, horizon, options):
+        return json.dumps([str(ticker), list(order), method, horizon, options or {}], sort_keys=True)
+
+    def get(self, ticker, series, order, method, horizon, options=None):
+        """
+        Look up the forecast for this exact series. Returns (forecast, None) on
+        a hit, (None, params) when an earlier fit of a prefix of the series can
+        warm-start the refit, and (None, None) otherwise.
+        """
+        self._load()
+        values = np.asarray(series, dtype=np.float64)
+        group = self._group(ticker, order, method, horizon, options)
+        digest = series_hash(values)
+
+        best = None
+        for key in self._groups.get(group, []):
+            entry = self._entries[key]
+            if entry["hash"] == digest and entry["n_obs"] == len(values):
+                entry["used"] = time.time()
+                self._dirty = True
+                self.stats["hits"] += 1
+                return entry["forecast"], None
+            if (entry["params"] is not None and entry["n_obs"] < len(values)
+                    and (best is None or entry["n_obs"] > best["n_obs"])
+                    and series_hash(values[:entry["n_obs"]]) == entry["hash"]):
+                best = entry
+
+        if best is not None:
+            best["used"] = time.time()
+            self._dirty = True
+            self.stats["warm_starts"] += 1
+            return None, best["params"]
+        self.stats["misses"] += 1
+        return None, None
+
+    def put(self, ticker, series, order, method, horizon, forecast, params=None, options=None):
+        self._load()
+        values = np.asarray(series, dtype=np.float64)
+        group = self._group(ticker, order, method, horizon, options)
+        digest = series_hash(values)
+        key = hashlib.sha1(f"{group}:{digest}".encode()).hexdigest()
+        if key not in self._entries:
+            self._groups.setdefault(group, []).append(key)
+        self._entries[key] = {
+            "group": group, "hash": digest, "n_obs": len(values), "forecast": float(forecast),
+            "params": None if params is None else [float(p) for p in params], "used": time.time(),
+        }
+        self._dirty = True
+
+    def _evict(self):
+        # Drop least recently used entries until the index fits in max_bytes
+        sizes = {key: len(key) + len(json.dumps(entry)) for key, entry in self._entries.items()}
+        total = sum(sizes.values())
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["used"]):
+            if total <= self.max_bytes:
+                break
+            total -= sizes[key]
+            self._groups[self._entries[key]["group"]].remove(key)
+            del self._entries[key]
+
+    def save(self):
+        """Write the index if anything changed, evicting entries over max_bytes."""
+        if not self._dirty:
+            return
+        self._evict()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, _INDEX_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self._entries}, f)
+        os.replace(tmp_path, os.path.join(self.directory, _INDEX_FILE))
+        self._dirty = False
+
+    def clear(self):
+        self._entries, self._groups = {}, {}
+        self._dirty = True
+        self.save()
+
+    def __len__(self):
+        self._load()
+        return len(self._entries)
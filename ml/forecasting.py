@@ -1,8 +1,20 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
+from ml.covariance import ledoit_wolf_covariance, factor_covariance
+from ml.instrumentation import stage, instrumented
+
+# Largest |phi| allowed for the closed-form AR(1) estimate
+_MAX_AR_COEF = 0.9999
 
+# (p, d, q) of the ARIMA model fitted to every ticker
+ARIMA_ORDER = (1, 1, 0)
 
+
+@instrumented("calculate_forecast")
 def calculate_forecast(returns, window_size=20):
     """
     Calculate a simple forecast model as an mvp: next-day expected return as average of past N days,
@@ -20,19 +32,257 @@ def calculate_forecast(returns, window_size=20):
     return forecasted_returns, forecasted_volatility
 
 
-def forecast_returns_arima(returns, forecast_horizon=1):
-    expected_returns = []
-    
-    for stock in returns.columns:
-        series = returns[stock].dropna()
-        model = ARIMA(series, order=(1,1,0))
-        model_fit = model.fit()
-        # Forecast the next step
-        forecast = model_fit.forecast(steps=forecast_horizon)
-        expected_returns.append(forecast.iloc[-1])  # Use the last forecasted value
-    
-    return np.array(expected_returns)
+def _fit_arima(series, forecast_horizon, start_params=None):
+    # statsmodels is slow to import; only load it once an ARIMA is actually fitted
+    from statsmodels.tsa.arima.model import ARIMA
+
+    model = ARIMA(series, order=ARIMA_ORDER)
+    # start_params from an earlier fit of the same ticker shorten the optimization
+    model_fit = model.fit(start_params=start_params)
+    # Forecast the next step
+    forecast = model_fit.forecast(steps=forecast_horizon)
+    return forecast.iloc[-1], np.asarray(model_fit.params)  # Use the last forecasted value
+
+
+def _fit_arima_forecast(series, forecast_horizon):
+    return _fit_arima(series, forecast_horizon)[0]
+
+
+def _fit_arima_chunk(chunk, forecast_horizon):
+    """
+    Fit one chunk of (ticker, series, start_params) tuples inside a worker process.
+    A failing fit is reported back per ticker instead of aborting the chunk,
+    and fits that raised a ConvergenceWarning are flagged.
+    """
+    from statsmodels.tools.sm_exceptions import ConvergenceWarning
+
+    results = []
+    for stock, series, start_params in chunk:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ConvergenceWarning)
+            try:
+                (forecast, params), error = _fit_arima(series, forecast_horizon, start_params), None
+            except Exception as e:
+                forecast, params, error = np.nan, None, f"{type(e).__name__}: {e}"
+        converged = not any(issubclass(w.category, ConvergenceWarning) for w in caught)
+        results.append((stock, forecast, params, error, converged))
+    return results
+
+
+def _ar1_differenced_forecast(values, forecast_horizon):
+    """
+    Closed-form ARIMA(1,1,0) forecast for every column of a NaN-free (T, n) array.
+
+    With d=1 and no constant the model is an AR(1) on the differenced series,
+    so phi is the least-squares slope of each difference on its lag and the
+    h-step forecast is y_T + dy_T * (phi + phi^2 + ... + phi^h).
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) < 3:
+        return np.full(values.shape[1], np.nan)
+
+    diffs = np.diff(values, axis=0)
+    lagged, current = diffs[:-1], diffs[1:]
+    denom = np.einsum('ij,ij->j', lagged, lagged)
+    phi = np.divide(np.einsum('ij,ij->j', lagged, current), denom,
+                    out=np.zeros(values.shape[1]), where=denom > 0)
+    # statsmodels enforces a stationary AR coefficient
+    phi = np.clip(phi, -_MAX_AR_COEF, _MAX_AR_COEF)
+
+    growth = (phi[:, None] ** np.arange(1, forecast_horizon + 1)).sum(axis=1)
+    return values[-1] + diffs[-1] * growth
+
+
+@instrumented("forecast.ar1")
+def forecast_returns_ar1(returns, forecast_horizon=1):
+    """
+    Vectorized ARIMA(1,1,0) forecasts for all columns of `returns` in one NumPy pass.
+
+    Columns without missing values are estimated together; columns with gaps are
+    estimated on their own non-missing observations, like the statsmodels path.
+
+    Returns:
+    np.array: Forecasted returns in the same order as `returns.columns`.
+    """
+    values = returns.to_numpy(dtype=float)
+    complete = ~np.isnan(values).any(axis=0)
+
+    expected_returns = np.empty(values.shape[1])
+    expected_returns[complete] = _ar1_differenced_forecast(values[:, complete], forecast_horizon)
+    for i in np.flatnonzero(~complete):
+        column = values[:, i]
+        expected_returns[i] = _ar1_differenced_forecast(column[~np.isnan(column), None], forecast_horizon)[0]
+    return expected_returns
+
+
+def check_arima_agreement(returns, forecast_horizon=1, rtol=1e-2):
+    """
+    Validate the closed-form backend against statsmodels on the same returns.
+
+    The difference for each ticker is measured relative to that ticker's return
+    standard deviation. Raises an AssertionError naming the tickers outside `rtol`.
 
-def compute_covariance_matrix(returns):
-    # Compute covariance matrix from historical returns
-    return returns.cov()
\ No newline at end of file
+    Returns:
+    pd.Series: Scaled absolute difference per ticker.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        reference = forecast_returns_arima(returns, forecast_horizon, method="statsmodels")
+    fast = forecast_returns_arima(returns, forecast_horizon, method="ols")
+
+    scale = returns.std().to_numpy()
+    scale[~(scale > 0)] = 1.0
+    diff = pd.Series(np.abs(fast - reference) / scale, index=returns.columns)
+
+    outside = diff[~(diff <= rtol)]
+    if len(outside):
+        raise AssertionError(
+            "Closed-form ARIMA forecasts disagree with statsmodels for "
+            + ", ".join(f"{s} ({d:.2e})" for s, d in outside.items())
+        )
+    return diff
+
+
+@instrumented("forecast.arima")
+def forecast_returns_arima(returns, forecast_horizon=1, n_jobs=None, chunksize=None, method="statsmodels",
+                           cache=None, cache_options=None):
+    """
+    Forecast the return of every column in `returns` with an ARIMA(1,1,0) model.
+
+    Parameters:
+    returns (pd.DataFrame): Returns, one column per ticker.
+    forecast_horizon (int): Number of steps to forecast; the last step is used. Default is 1.
+    method (str): 'statsmodels' fits each ticker with statsmodels' ARIMA. 'ols' uses the
+                  closed-form least-squares estimator for all tickers at once
+                  (see forecast_returns_ar1); n_jobs and chunksize are then ignored.
+    n_jobs (int): Number of worker processes. None or 1 fits serially in this process,
+                  -1 uses every CPU.
+    chunksize (int): Tickers sent to a worker per task. Default splits the tickers into
+                     about four chunks per worker, so short series aren't dominated by IPC.
+    cache (ml.forecast_cache.ForecastCache): Reuse forecasts of unchanged series and
+                  warm-start statsmodels refits of series that only gained new
+                  observations. Only the remaining tickers are fitted. Ignored
+                  with method='ols', which is cheaper than the cache lookup.
+    cache_options (dict): Preprocessing options the returns were produced with (e.g.
+                  {"normalize": True}); part of the cache key.
+
+    Returns:
+    np.array: Forecasted returns in the same order as `returns.columns`. In parallel mode a
+              ticker whose fit raises falls back to its historical mean, and failed or
+              non-converged tickers are reported in a single warning each.
+    """
+    if method not in ("statsmodels", "ols"):
+        raise ValueError(f"Unknown method '{method}', expected 'statsmodels' or 'ols'")
+    if cache is not None and method == "statsmodels":
+        return _forecast_with_cache(returns, forecast_horizon, n_jobs, chunksize, cache, cache_options)
+    if method == "ols":
+        return forecast_returns_ar1(returns, forecast_horizon)
+
+    forecasts, _ = _fit_arima_all(returns, forecast_horizon, n_jobs, chunksize)
+    return np.array([forecasts[stock] for stock in returns.columns])
+
+
+def _fit_arima_all(returns, forecast_horizon, n_jobs=None, chunksize=None, start_params=None):
+    """
+    Fit statsmodels' ARIMA to every column; returns ({ticker: forecast}, {ticker: params}).
+    start_params optionally maps tickers to initial parameters for their fit.
+    """
+    start_params = start_params or {}
+
+    if n_jobs is None or n_jobs == 1:
+        forecasts, params = {}, {}
+        
+        for stock in returns.columns:
+            series = returns[stock].dropna()
+            with stage("forecast.arima.fit", ticker=stock):
+                forecasts[stock], params[stock] = _fit_arima(series, forecast_horizon, start_params.get(stock))
+        
+        return forecasts, params
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    tasks = [(stock, returns[stock].dropna(), start_params.get(stock)) for stock in returns.columns]
+    if chunksize is None:
+        chunksize = max(1, -(-len(tasks) // (n_jobs * 4)))
+    chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+
+    forecasts = {}
+    params = {}
+    failures = {}
+    not_converged = []
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [executor.submit(_fit_arima_chunk, chunk, forecast_horizon) for chunk in chunks]
+        for future in futures:
+            for stock, forecast, fitted_params, error, converged in future.result():
+                forecasts[stock] = forecast
+                if error is not None:
+                    failures[stock] = error
+                else:
+                    params[stock] = fitted_params
+                    if not converged:
+                        not_converged.append(stock)
+
+    if not_converged:
+        from statsmodels.tools.sm_exceptions import ConvergenceWarning
+        warnings.warn("ARIMA fit did not converge for " + ", ".join(not_converged), ConvergenceWarning)
+    if failures:
+        for stock in failures:
+            forecasts[stock] = returns[stock].mean()
+        warnings.warn(
+            "ARIMA fit failed for " + ", ".join(f"{s} ({e})" for s, e in failures.items())
+            + "; using the historical mean return for these tickers"
+        )
+    return forecasts, params
+
+
+def _forecast_with_cache(returns, forecast_horizon, n_jobs, chunksize, cache, cache_options):
+    # Only statsmodels fits are cached; they are keyed under that method name
+    forecasts = {}
+    start_params = {}
+    missing = []
+    with stage("forecast.arima.cache_lookup", tickers=len(returns.columns)):
+        for stock in returns.columns:
+            series = returns[stock].dropna().to_numpy()
+            forecast, params = cache.get(stock, series, ARIMA_ORDER, "statsmodels", forecast_horizon,
+                                         cache_options)
+            if forecast is not None:
+                forecasts[stock] = forecast
+            else:
+                missing.append(stock)
+                if params is not None:
+                    start_params[stock] = params
+
+    if missing:
+        fitted, fitted_params = _fit_arima_all(returns[missing], forecast_horizon, n_jobs, chunksize, start_params)
+        for stock in missing:
+            forecasts[stock] = fitted[stock]
+            # Fallbacks for failed fits have no parameters and aren't cached
+            if stock in fitted_params:
+                cache.put(stock, returns[stock].dropna().to_numpy(), ARIMA_ORDER, "statsmodels", forecast_horizon,
+                          fitted[stock], fitted_params.get(stock), cache_options)
+        cache.save()
+
+    return np.array([forecasts[stock] for stock in returns.columns])
+
+@instrumented("compute_covariance_matrix")
+def compute_covariance_matrix(returns, method="sample", n_factors=10):
+    """
+    Compute the covariance matrix of historical returns.
+
+    Parameters:
+    returns (pd.DataFrame): Returns, one column per ticker.
+    method (str): 'sample' returns the dense sample covariance. 'factor' returns a
+                  LowRankCovariance (see ml.covariance) that GeneticOptimizer
+                  scores in O(NK) without a dense N x N matrix. 'ledoit_wolf'
+                  returns the dense shrunk matrix, or a LowRankCovariance with
+                  K = T when there are fewer observations T than assets.
+    n_factors (int): Number of factors for method='factor'. Default is 10.
+    """
+    if method == "sample":
+        return returns.cov()
+    if method == "ledoit_wolf":
+        return ledoit_wolf_covariance(returns)
+    if method == "factor":
+        return factor_covariance(returns, n_factors)
+    raise ValueError(f"Unknown method '{method}', expected 'sample', 'ledoit_wolf' or 'factor'")
@@ -0,0 +1,184 @@
+import json
+import pandas as pd
+import numpy as np
+
+
+class IncrementalStats:
+    """
+    Running return statistics that are updated one price row at a time.
+
+    Holds the running mean and co-moment matrix of daily returns (Welford's
+    algorithm), plus the last `window_size` returns for the rolling statistics
+    used by calculate_forecast. Each new price row costs O(N^2), independent of
+    the length of the history.
+    """
+
+    def __init__(self, columns, window_size=20):
+        self.columns = list(columns)
+        self.window_size = window_size
+        n = len(self.columns)
+
+        self.last_date = None
+        self.last_prices = None
+        self.last_returns = None
+
+        # Full-history statistics
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.comoment = np.zeros((n, n))
+
+        # Rolling window: ring buffer of the last window_size returns and its sums
+        self.window = np.zeros((window_size, n))
+        self.window_pos = 0
+        self.window_count = 0
+        self.window_sum = np.zeros(n)
+        self.window_cross = np.zeros((n, n))
+        self._updates_since_resync = 0
+
+    @classmethod
+    def from_prices(cls, prices, window_size=20):
+        """
+        Build the statistics from a pivoted price frame (as returned by load_data)
+        in one batch pass.
+        """
+        stats = cls(prices.columns, window_size)
+        returns = prices.pct_change().dropna().to_numpy(dtype=float)
+
+        if len(returns):
+            stats.count = len(returns)
+            stats.mean = returns.mean(axis=0)
+            centered = returns - stats.mean
+            stats.comoment = centered.T @ centered
+            stats.last_returns = returns[-1].copy()
+
+            recent = returns[-window_size:]
+            stats.window[:len(recent)] = recent
+            stats.window_count = len(recent)
+            stats.window_pos = len(recent) % window_size
+            stats._resync_window()
+
+        stats.last_date = prices.index[-1]
+        stats.last_prices = prices.iloc[-1].to_numpy(dtype=float)
+        return stats
+
+    def update(self, prices):
+        """
+        Add new price rows: a Series for one date (named by its date) or a frame
+        indexed by date. Rows not newer than the last seen date are ignored and
+        missing prices are forward-filled from the previous row, as in load_data.
+        """
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame().T
+        prices = prices.reindex(columns=self.columns).sort_index()
+
+        for date, row in prices.iterrows():
+            if self.last_date is not None and date <= self.last_date:
+                continue
+            self._add_prices(date, row.to_numpy(dtype=float))
+        return self
+
+    def _add_prices(self, date, row):
+        if self.last_prices is not None:
+            row = np.where(np.isnan(row), self.last_prices, row)
+            self._add_returns(row / self.last_prices - 1)
+        self.last_date = date
+        self.last_prices = row
+
+    def _add_returns(self, r):
+        # Welford update of the mean and co-moment matrix
+        self.count += 1
+        delta = r - self.mean
+        self.mean += delta / self.count
+        self.comoment += np.outer(delta, r - self.mean)
+        self.last_returns = r
+
+        # Rolling window: drop the oldest return once the buffer is full
+        if self.window_count == self.window_size:
+            old = self.window[self.window_pos]
+            self.window_sum -= old
+            self.window_cross -= np.outer(old, old)
+        else:
+            self.window_count += 1
+        self.window[self.window_pos] = r
+        self.window_pos = (self.window_pos + 1) % self.window_size
+        self.window_sum += r
+        self.window_cross += np.outer(r, r)
+
+        # Recompute the window sums from the buffer now and then so that
+        # add/subtract rounding errors don't accumulate
+        self._updates_since_resync += 1
+        if self._updates_since_resync >= self.window_size:
+            self._resync_window()
+
+    def _resync_window(self):
+        filled = self.window[:self.window_count]
+        self.window_sum = filled.sum(axis=0)
+        self.window_cross = filled.T @ filled
+        self._updates_since_resync = 0
+
+    def returns_mean(self):
+        return pd.Series(self.mean, index=self.columns)
+
+    def covariance(self):
+        """
+        Sample covariance of all returns seen so far, equal to returns.cov().
+        """
+        cov = self.comoment / (self.count - 1) if self.count > 1 else np.full_like(self.comoment, np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def window_forecast(self):
+        """
+        Rolling mean and standard deviation of the last window_size returns,
+        equal to calculate_forecast(returns, window_size).
+        """
+        if self.window_count < self.window_size:
+            nan = pd.Series(np.nan, index=self.columns)
+            return nan, nan.copy()
+        cov_diag = np.diag(self.window_covariance_values())
+        mean = self.window_sum / self.window_count
+        return (pd.Series(mean, index=self.columns),
+                pd.Series(np.sqrt(np.clip(cov_diag, 0, None)), index=self.columns))
+
+    def window_covariance_values(self):
+        k = self.window_count
+        if k < 2:
+            return np.full((len(self.columns), len(self.columns)), np.nan)
+        mean = self.window_sum / k
+        return (self.window_cross - k * np.outer(mean, mean)) / (k - 1)
+
+    def window_covariance(self):
+        """
+        Sample covariance of the last window_size returns.
+        """
+        return pd.DataFrame(self.window_covariance_values(), index=self.columns, columns=self.columns)
+
+    def save(self, path):
+        """
+        Persist the statistics to a .npz file so a later session can keep updating them.
+        """
+        meta = {"columns": self.columns, "window_size": self.window_size, "count": self.count,
+                "window_pos": self.window_pos, "window_count": self.window_count,
+                "last_date": None if self.last_date is None else pd.Timestamp(self.last_date).isoformat()}
+        arrays = {"mean": self.mean, "comoment": self.comoment, "window": self.window}
+        if self.last_prices is not None:
+            arrays["last_prices"] = self.last_prices
+        if self.last_returns is not None:
+            arrays["last_returns"] = self.last_returns
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            stats = cls(meta["columns"], meta["window_size"])
+            stats.count = meta["count"]
+            stats.window_pos = meta["window_pos"]
+            stats.window_count = meta["window_count"]
+            stats.last_date = None if meta["last_date"] is None else pd.Timestamp(meta["last_date"])
+            stats.mean = data["mean"]
+            stats.comoment = data["comoment"]
+            stats.window = data["window"]
+            stats.last_prices = data["last_prices"] if "last_prices" in data else None
+            stats.last_returns = data["last_returns"] if "last_returns" in data else None
+        stats._resync_window()
+        return stats
@@ -0,0 +1,195 @@
+"""
+Lightweight per-stage instrumentation for the data -> forecast -> GA pipeline.
+
+Instrumentation is off until a sink is installed with set_sink(). While it is
+off, stage() hands back one shared no-op context manager and instrumented()
+functions call straight through, so the hooks can stay in production code.
+
+    from ml import instrumentation
+    report = instrumentation.MemorySink()
+    instrumentation.set_sink(report, track_memory=True)
+    ...
+    print(report.summary())
+
+Every event is a dict with at least "stage" and, for timed stages, "seconds"
+(plus "peak_mb" when memory tracking is on). The GA also emits one
+"ga.generation" event per generation with its evaluation and selection/variation
+timings.
+"""
+import json
+import time
+import threading
+import functools
+import contextlib
+import tracemalloc
+
+_sink = None
+_track_memory = False
+_local = threading.local()
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def set_sink(sink, track_memory=False):
+    """
+    Install a sink (MemorySink, JSONLinesSink, CallbackSink or any callable
+    taking an event dict) and enable instrumentation; None disables it.
+    With track_memory=True each stage also reports its peak traced memory.
+    """
+    global _sink, _track_memory
+    _sink = sink
+    _track_memory = track_memory and sink is not None
+    if _track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enabled():
+    return _sink is not None
+
+
+def emit(stage_name, **fields):
+    """Send one event to the sink, if instrumentation is enabled."""
+    sink = _sink
+    if sink is not None:
+        sink({"stage": stage_name, **fields})
+
+
+class _Stage:
+    __slots__ = ("name", "fields", "start", "start_mem", "peak")
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        if _track_memory:
+            stack = _memory_stack()
+            current, peak = tracemalloc.get_traced_memory()
+            # Hand the peak seen so far to the enclosing stage before resetting it
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.start_mem = current
+            self.peak = current
+            stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        event = {"seconds": seconds, **self.fields}
+        if _track_memory:
+            stack = _memory_stack()
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            event["peak_mb"] = (self.peak - self.start_mem) / 1e6
+            if stack and stack[-1] is self:
+                stack.pop()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+        emit(self.name, **event)
+        return False
+
+
+def _memory_stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def stage(name, **fields):
+    """
+    Context manager timing the enclosed block as stage `name`; extra fields are
+    added to its event. A shared no-op when instrumentation is disabled.
+    """
+    if _sink is None:
+        return _NULL_STAGE
+    return _Stage(name, fields)
+
+
+def instrumented(name):
+    """Decorator timing every call of the function as stage `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _sink is None:
+                return fn(*args, **kwargs)
+            with _Stage(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+##########
+# Sinks
+##########
+
+class MemorySink:
+    """
+    Keeps events in memory and aggregates wall time, call counts and peak
+    memory per stage. max_events bounds how many raw events are kept.
+    """
+
+    def __init__(self, max_events=10000):
+        self.max_events = max_events
+        self.events = []
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            if len(self.events) < self.max_events:
+                self.events.append(event)
+            stats = self.stats.setdefault(event["stage"], {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stats["calls"] += 1
+            seconds = event.get("seconds")
+            if seconds is not None:
+                stats["seconds"] += seconds
+                stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if "peak_mb" in event:
+                stats["peak_mb"] = max(stats.get("peak_mb", 0.0), event["peak_mb"])
+
+    def report(self):
+        """Per-stage totals as {stage: {"calls", "seconds", "max_seconds"[, "peak_mb"]}}."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self.stats.items()}
+
+    def summary(self):
+        lines = [f"{'stage':<32} {'calls':>7} {'total s':>10} {'max s':>10} {'peak MB':>9}"]
+        for name, stats in sorted(self.report().items(), key=lambda item: -item[1]["seconds"]):
+            peak = f"{stats['peak_mb']:>9.1f}" if "peak_mb" in stats else f"{'-':>9}"
+            lines.append(f"{name:<32} {stats['calls']:>7} {stats['seconds']:>10.4f} "
+                         f"{stats['max_seconds']:>10.4f} {peak}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.stats.clear()
+
+
+class JSONLinesSink:
+    """Appends every event as one JSON line to `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps({"time": time.time(), **event}, default=float)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CallbackSink:
+    """Forwards every event to `callback(event)`."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, event):
+        self.callback(event)
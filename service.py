@@ -0,0 +1,336 @@
+"""
+Local optimization service: keeps prices, returns, covariance and forecasts
+warm in memory and runs optimization jobs from a queue on a worker pool.
+
+    python service.py --data data/prices.csv --port 8765 --workers 2
+
+HTTP API (JSON):
+
+    GET    /health           service status
+    GET    /tickers          available tickers
+    POST   /jobs             submit a job; returns {"id": ...}
+    GET    /jobs/<id>        job status, fitness history so far and, when done, the result
+    DELETE /jobs/<id>        cancel a queued or running job
+
+A job has the keys tickers (omit for all), forecast ('default' or 'arima'),
+arima_method ('statsmodels' or 'ols'), normalize, covariance ('sample',
+'ledoit_wolf' or 'factor') and optimizer (GeneticOptimizer keyword
+arguments). Repeat requests for the same tickers and options reuse the
+prepared inputs and go straight to the GA.
+
+OptimizationClient talks to a running service from the GUI or a notebook.
+"""
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import traceback
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from ga.cov_ga import GeneticOptimizer
+from ml.data_cache import cached_symbols
+from ml.data_preprocessing import load_data, compute_returns, normalize_returns
+from ml.forecast_cache import ForecastCache, default_forecast_cache_dir
+from ml.forecasting import calculate_forecast, forecast_returns_arima, compute_covariance_matrix
+
+DEFAULT_PORT = 8765
+
+DEFAULT_JOB = {
+    "tickers": None,
+    "forecast": "default",
+    "arima_method": "statsmodels",
+    "normalize": False,
+    "covariance": "sample",
+    "optimizer": {},
+}
+
+
+class OptimizationService:
+    """
+    Job queue and warm state behind the HTTP API. Jobs run on a thread pool so
+    they share the in-memory inputs; up to max_inputs prepared input sets are
+    kept, least recently used first out.
+    """
+
+    def __init__(self, data_file, workers=2, max_inputs=32, max_jobs=1000):
+        self.data_file = data_file
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_inputs = max_inputs
+        self.max_jobs = max_jobs
+        self.forecast_cache = ForecastCache(default_forecast_cache_dir(data_file))
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.forecast_lock = threading.Lock()
+
+        data = load_data(data_file, use_cache=True)
+        self.all_tickers = cached_symbols(data_file) or list(data.columns)
+        self.returns = {None: compute_returns(data)}
+        self.inputs = OrderedDict()
+
+    def _returns(self, tickers):
+        # Returns per ticker selection, computed from its own filtered load as in the GUI
+        with self.lock:
+            returns = self.returns.get(tickers)
+        if returns is None:
+            returns = compute_returns(load_data(self.data_file, list(tickers), use_cache=True))
+            with self.lock:
+                self.returns[tickers] = returns
+                while len(self.returns) > self.max_inputs + 1:
+                    del self.returns[next(k for k in self.returns if k is not None)]
+        return returns
+
+    def prepare_inputs(self, job):
+        """(expected_returns, cov_matrix, tickers, cached) for a job, reusing warm inputs."""
+        tickers = tuple(job["tickers"]) if job["tickers"] else None
+        key = (tickers, job["normalize"], job["forecast"], job["arima_method"], job["covariance"])
+        with self.lock:
+            if key in self.inputs:
+                self.inputs.move_to_end(key)
+                return (*self.inputs[key], True)
+
+        returns = self._returns(tickers)
+        if returns.empty:
+            raise ValueError("No overlapping price history for the selected tickers")
+        processed_returns = normalize_returns(returns) if job["normalize"] else returns
+        if job["forecast"] == "arima":
+            # The forecast cache isn't thread-safe; fits for different jobs take turns
+            with self.forecast_lock:
+                expected_returns = forecast_returns_arima(processed_returns, method=job["arima_method"],
+                                                          cache=self.forecast_cache,
+                                                          cache_options={"normalize": job["normalize"]})
+        else:
+            expected_returns, _ = calculate_forecast(processed_returns)
+            expected_returns = expected_returns.values
+        cov_matrix = compute_covariance_matrix(processed_returns, method=job["covariance"])
+        if isinstance(cov_matrix, pd.DataFrame):
+            cov_matrix = cov_matrix.values
+        inputs = (expected_returns, cov_matrix, list(processed_returns.columns))
+
+        with self.lock:
+            self.inputs[key] = inputs
+            while len(self.inputs) > self.max_inputs:
+                self.inputs.popitem(last=False)
+        return (*inputs, False)
+
+    def submit(self, job):
+        job = {**DEFAULT_JOB, **job}
+        if job["forecast"] not in ("default", "arima"):
+            raise ValueError(f"Unknown forecast '{job['forecast']}', expected 'default' or 'arima'")
+        if job["tickers"]:
+            unknown = set(job["tickers"]) - set(self.all_tickers)
+            if unknown:
+                raise ValueError(f"Unknown tickers: {', '.join(sorted(unknown))}")
+
+        job_id = uuid.uuid4().hex
+        state = {"id": job_id, "status": "queued", "job": job, "history": [], "result": None, "error": None,
+                 "submitted": time.time(), "cancel": threading.Event()}
+        with self.lock:
+            self.jobs[job_id] = state
+            # Forget the oldest finished jobs
+            for old_id in [i for i, s in self.jobs.items() if s["status"] not in ("queued", "running")]:
+                if len(self.jobs) <= self.max_jobs:
+                    break
+                del self.jobs[old_id]
+        self.executor.submit(self._run, state)
+        return job_id
+
+    def _run(self, state):
+        if state["cancel"].is_set():
+            return
+        state["status"] = "running"
+        start = time.perf_counter()
+        try:
+            job = state["job"]
+            expected_returns, cov_matrix, tickers, cached = self.prepare_inputs(job)
+            optimizer = GeneticOptimizer(**{"engine": "numpy", **job["optimizer"], "verbose": False})
+
+            def on_generation(gen, best_fitness, best_individual):
+                state["history"].append(float(best_fitness))
+                return state["cancel"].is_set()
+
+            best_portfolio, best_fitness, _ = optimizer.run(expected_returns, cov_matrix, tickers,
+                                                            callback=on_generation)
+            state["result"] = {
+                "sharpe": float(best_fitness),
+                "weights": dict(zip(tickers, map(float, best_portfolio))),
+                "stop_reason": optimizer.stop_reason,
+                "inputs_cached": cached,
+                "seconds": time.perf_counter() - start,
+            }
+            state["status"] = "cancelled" if optimizer.cancelled else "done"
+        except Exception as e:
+            state["error"] = f"{type(e).__name__}: {e}"
+            state["traceback"] = traceback.format_exc()
+            state["status"] = "error"
+
+    def status(self, job_id, since=0):
+        """Job state as JSON-ready dict; history starts at index `since`."""
+        with self.lock:
+            state = self.jobs.get(job_id)
+        if state is None:
+            return None
+        return {"id": job_id, "status": state["status"], "generations": len(state["history"]),
+                "history": state["history"][since:], "result": state["result"], "error": state["error"]}
+
+    def cancel(self, job_id):
+        with self.lock:
+            state = self.jobs.get(job_id)
+        if state is None:
+            return False
+        state["cancel"].set()
+        if state["status"] == "queued":
+            state["status"] = "cancelled"
+        return True
+
+    def health(self):
+        with self.lock:
+            counts = {}
+            for state in self.jobs.values():
+                counts[state["status"]] = counts.get(state["status"], 0) + 1
+            return {"status": "ok", "data_file": self.data_file, "tickers": len(self.all_tickers),
+                    "warm_inputs": len(self.inputs), "jobs": counts}
+
+    def shutdown(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        self.executor.shutdown(wait=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_id(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/health":
+            return self._send(200, self.service.health())
+        if path == "/tickers":
+            return self._send(200, {"tickers": list(self.service.all_tickers)})
+        job_id = self._job_id()
+        if job_id:
+            try:
+                since = int(dict(p.split("=", 1) for p in query.split("&") if "=" in p).get("since", 0))
+            except ValueError:
+                return self._send(400, {"error": "since must be an integer"})
+            status = self.service.status(job_id, since)
+            if status is not None:
+                return self._send(200, status)
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            return self._send(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length) or b"{}")
+            self._send(202, {"id": self.service.submit(job)})
+        except (ValueError, TypeError) as e:
+            self._send(400, {"error": str(e)})
+
+    def do_DELETE(self):
+        job_id = self._job_id()
+        if job_id and self.service.cancel(job_id):
+            return self._send(200, {"id": job_id, "cancelled": True})
+        self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service, host="127.0.0.1", port=DEFAULT_PORT):
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class OptimizationClient:
+    """
+    Client for a running service, usable from the GUI or a notebook:
+
+        client = OptimizationClient()
+        job_id = client.submit(tickers=["AAPL", "MSFT"], optimizer={"ngen": 50})
+        result = client.wait(job_id)
+    """
+
+    def __init__(self, url=f"http://127.0.0.1:{DEFAULT_PORT}", timeout=10):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read() or b"{}").get("error", str(e))) from None
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def tickers(self):
+        return self._request("GET", "/tickers")["tickers"]
+
+    def submit(self, **job):
+        return self._request("POST", "/jobs", job)["id"]
+
+    def status(self, job_id, since=0):
+        return self._request("GET", f"/jobs/{job_id}?since={since}")
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def wait(self, job_id, poll_interval=0.2, timeout=None):
+        """Poll until the job finishes; returns its final status."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.status(job_id)
+            if status["status"] not in ("queued", "running"):
+                return status
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} still {status['status']} after {timeout}s")
+            time.sleep(poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local portfolio optimization service.")
+    parser.add_argument("--data", default="data/prices.csv", help="long-format price CSV")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=2, help="optimization jobs run at once")
+    args = parser.parse_args(argv)
+
+    service = OptimizationService(args.data, workers=args.workers)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving {args.data} ({len(service.all_tickers)} tickers) on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from ga.cov_ga import GeneticOptimizer
+
+
+def random_inputs(n_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, (n_assets, n_assets))
+    return rng.normal(0.001, 0.001, n_assets), factors @ factors.T + 1e-4 * np.eye(n_assets)
+
+
+@pytest.mark.parametrize("pop_size, tourn_size", [(50, 3), (20, 5), (20, 19), (20, 20)])
+def test_tournament_contestants_are_distinct(pop_size, tourn_size):
+    optimizer = GeneticOptimizer(pop_size=pop_size, tourn_size=tourn_size, engine="numpy", seed=0, verbose=False)
+    contestants = optimizer.tournament_contestants(pop_size, (4, 25))
+    assert contestants.shape == (4, 25, tourn_size)
+    assert ((contestants >= 0) & (contestants < pop_size)).all()
+    ordered = np.sort(contestants, axis=-1)
+    assert (ordered[..., 1:] != ordered[..., :-1]).all()
+
+
+def test_tournament_as_large_as_population():
+    expected_returns, cov_matrix = random_inputs(10)
+    optimizer = GeneticOptimizer(pop_size=20, tourn_size=20, ngen=5, engine="numpy", seed=0, verbose=False)
+    _, best_fitness, _ = optimizer.run(expected_returns, cov_matrix, symbols=list(range(10)))
+    assert np.isfinite(best_fitness)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "python"])
+def test_adaptive_resume_matches_uninterrupted_run(engine, tmp_path):
+    expected_returns, cov_matrix = random_inputs(15)
+    symbols = list(range(15))
+    settings = dict(pop_size=30, seed=3, engine=engine, adaptive=True, verbose=False)
+    _, _, full_history = GeneticOptimizer(ngen=40, **settings).run(expected_returns, cov_matrix, symbols)
+
+    path = str(tmp_path / "checkpoint.npz")
+    GeneticOptimizer(ngen=20, **settings).run(expected_returns, cov_matrix, symbols, checkpoint_path=path)
+    resumed = GeneticOptimizer(ngen=40, **settings)
+    _, _, history = resumed.run(expected_returns, cov_matrix, symbols, checkpoint_path=path, resume=True)
+    assert history == full_history
+    assert (resumed.mutpb, resumed.mut_step) == (0.2, 0.05)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.covariance import LowRankCovariance, ledoit_wolf_covariance, factor_covariance
+
+sklearn_covariance = pytest.importorskip("sklearn.covariance")
+
+
+def random_returns(n_obs, n_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(0, 0.01, (n_obs, n_assets)), columns=[f"T{i}" for i in range(n_assets)])
+
+
+@pytest.mark.parametrize("n_obs, n_assets", [(200, 40), (30, 40)])
+def test_ledoit_wolf_matches_sklearn(n_obs, n_assets):
+    returns = random_returns(n_obs, n_assets)
+    cov = ledoit_wolf_covariance(returns)
+    # Low-rank form only pays off with fewer observations than assets
+    assert isinstance(cov, LowRankCovariance) == (n_obs < n_assets)
+    dense = cov.to_dense() if isinstance(cov, LowRankCovariance) else cov
+    expected, _ = sklearn_covariance.ledoit_wolf(returns.to_numpy())
+    np.testing.assert_allclose(dense.to_numpy(), expected, rtol=1e-10, atol=1e-15)
+    assert list(dense.columns) == list(returns.columns)
+
+
+def test_factor_covariance_keeps_sample_variances():
+    returns = random_returns(200, 40)
+    cov = factor_covariance(returns, n_factors=5)
+    assert cov.n_factors == 5
+    np.testing.assert_allclose(np.diag(cov.to_dense()), returns.var().to_numpy(), rtol=1e-8)
@@ -0,0 +1,35 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.forecasting import forecast_returns_ar1, forecast_returns_arima, check_arima_agreement
+
+pytest.importorskip("statsmodels")
+
+
+def synthetic_returns(n_days=300, n_tickers=8, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=n_days)
+    # AR(1) returns so the differenced series has a real coefficient to estimate
+    values = np.zeros((n_days, n_tickers))
+    phi = rng.uniform(-0.5, 0.5, n_tickers)
+    noise = rng.normal(0.0005, 0.01, (n_days, n_tickers))
+    for t in range(1, n_days):
+        values[t] = phi * values[t - 1] + noise[t]
+    return pd.DataFrame(values, index=dates, columns=[f"T{i}" for i in range(n_tickers)])
+
+
+def test_ar1_matches_statsmodels_arima():
+    returns = synthetic_returns()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        reference = forecast_returns_arima(returns, method="statsmodels")
+    fast = forecast_returns_ar1(returns)
+    np.testing.assert_allclose(fast, reference, rtol=0, atol=1e-4)
+
+
+def test_check_arima_agreement_passes_on_synthetic_returns():
+    diff = check_arima_agreement(synthetic_returns(seed=1))
+    assert (diff <= 1e-2).all()
@@ -0,0 +1,10 @@
+import pytest
+
+from ga.island_ga import IslandGeneticOptimizer
+
+
+@pytest.mark.parametrize("option", [{"delta_eval": True}, {"hybrid": True}, {"adaptive": True},
+                                    {"stall_generations": 5}, {"min_diversity": 0.1}])
+def test_unsupported_options_raise(option):
+    with pytest.raises(ValueError):
+        IslandGeneticOptimizer(**option)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from ga.nsga2 import NSGA2Optimizer, dominance_matrix, non_dominated_sort
+
+
+def random_inputs(n_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, (n_assets, n_assets))
+    return rng.normal(0.001, 0.001, n_assets), factors @ factors.T + 1e-4 * np.eye(n_assets)
+
+
+def test_two_objective_sort_matches_dominance_matrix():
+    rng = np.random.default_rng(0)
+    # Rounded so that ties in one objective are common
+    objectives = np.round(rng.random((300, 2)), 1)
+    dominates = dominance_matrix(objectives)
+    ranks = non_dominated_sort(objectives)
+    # Nothing dominates a point from its own or a worse front, and every point
+    # past the first front is dominated by one from the front before it
+    assert not (dominates & (ranks[:, None] >= ranks[None, :])).any()
+    for i in np.flatnonzero(ranks > 0):
+        assert dominates[ranks == ranks[i] - 1, i].any()
+
+
+def test_run_returns_non_dominated_front():
+    expected_returns, cov_matrix = random_inputs(10)
+    front = NSGA2Optimizer(pop_size=40, ngen=10, seed=0, verbose=False).run(expected_returns, cov_matrix)
+    objectives = np.column_stack([-front["return"], front["volatility"]])
+    assert not dominance_matrix(objectives).any()
+    assert front["volatility"].is_monotonic_increasing
+    np.testing.assert_allclose(front[list(range(10))].sum(axis=1), 1.0)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from ga.sparse_ga import SparseGeneticOptimizer
+
+
+def random_inputs(n_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, (n_assets, n_assets))
+    return rng.normal(0.001, 0.001, n_assets), factors @ factors.T + 1e-4 * np.eye(n_assets)
+
+
+@pytest.mark.parametrize("n_assets, max_holdings", [(3, 10), (5, 30), (1, 4)])
+def test_universe_smaller_than_half_max_holdings(n_assets, max_holdings):
+    expected_returns, cov_matrix = random_inputs(n_assets)
+    optimizer = SparseGeneticOptimizer(max_holdings=max_holdings, pop_size=20, ngen=5, seed=0, verbose=False)
+    best_portfolio, best_fitness, _ = optimizer.run(expected_returns, cov_matrix)
+    assert len(best_portfolio) == n_assets
+    assert np.isclose(sum(best_portfolio), 1.0)
+    assert np.isfinite(best_fitness)
+
+
+def test_holdings_within_max_holdings():
+    expected_returns, cov_matrix = random_inputs(40)
+    optimizer = SparseGeneticOptimizer(max_holdings=5, pop_size=30, ngen=10, seed=0, verbose=False)
+    best_portfolio, _, _ = optimizer.run(expected_returns, cov_matrix)
+    assert 1 <= np.count_nonzero(best_portfolio) <= 5
+    assert all(len(idx) <= 5 for idx, _ in optimizer.population)
+
+
+@pytest.mark.parametrize("option", [{"engine": "python"}, {"delta_eval": True}, {"hybrid": True},
+                                    {"adaptive": True}, {"min_diversity": 0.1}])
+def test_unsupported_options_raise(option):
+    with pytest.raises(ValueError):
+        SparseGeneticOptimizer(**option)